@@ -2,45 +2,130 @@ import discord
 from discord.ext import commands
 import random
 from datetime import datetime
-import json
 import os
-import logging
+import asyncio
+from nucleo.armazenamento import criar_armazenamento
+from nucleo.dinheiro import cabe_no_saldo, formatar_reais, para_centavos
+from nucleo.ranking import Ranking
+from nucleo.limites import Limitador, LimiteExcedido
+from nucleo.travas import GerenciadorTravas
+from nucleo.persistencia import EscritorEmLote, obter_persistencia
+from nucleo import recarga
+
+# Intents usados no modo enxuto: o conversor discord.Member do transferir
+INTENTS = ["members"]
+
+# Limites de uso: (usos, período em segundos) por usuário e por servidor
+LIMITES = {
+    "trabalhar": {"usuario": (1, 60), "servidor": (30, 60)},
+    "jackpot": {"usuario": (5, 60), "servidor": (60, 60)},
+    "depositar": {"usuario": (5, 60)},
+    "transferir": {"usuario": (5, 60)},
+    "criarconta": {"usuario": (1, 60)},
+}
 
 class Banco(commands.Cog):
+    # Estado vivo entregue à nova instância quando a extensão é recarregada
+    ESTADO_RECARGA = ("armazenamento", "saldos", "ranking", "travas", "limitador", "trava_compactacao")
+
     def __init__(self, bot):
         self.bot = bot
-        # Configuração do logging
-        self.logger = logging.getLogger('banco')
-        self.logger.setLevel(logging.INFO)
-        
-        # Criar diretório de dados se não existir
-        if not os.path.exists('data'):
-            os.makedirs('data')
-            
-        # Configurar arquivo de log
-        file_handler = logging.FileHandler('data/transactions.log')
-        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-        self.logger.addHandler(file_handler)
-        
-        # Carregar dados das contas
-        self.accounts_file = 'data/accounts.json'
-        self.saldos = self.load_accounts()
-
-    def load_accounts(self):
-        """Carrega os dados das contas do arquivo JSON"""
-        if os.path.exists(self.accounts_file):
-            with open(self.accounts_file, 'r') as f:
-                return json.load(f)
-        return {}
-
-    def save_accounts(self):
-        """Salva os dados das contas no arquivo JSON"""
-        with open(self.accounts_file, 'w') as f:
-            json.dump(self.saldos, f, indent=4, default=str)
-
-    def log_transaction(self, transaction_type, details):
-        """Registra uma transação no arquivo de log"""
-        self.logger.info(f"{transaction_type}: {json.dumps(details, default=str)}")
+        self.persistencia = obter_persistencia()
+        self.saldos = {}
+        self.ranking = Ranking()
+        self.travas = GerenciadorTravas()
+        self.limitador = Limitador(LIMITES)
+        self.trava_compactacao = asyncio.Lock()
+        self.compactacao = None
+
+    async def cog_load(self):
+        estado = recarga.retomar(__name__)
+        if estado:
+            # Recarga: assume as contas, travas e limites da instância anterior sem ler o disco
+            for chave, valor in estado.items():
+                setattr(self, chave, valor)
+        else:
+            # Criar diretório de dados se não existir
+            if not os.path.exists('data'):
+                os.makedirs('data')
+
+            # Carregar dados das contas do backend configurado (sqlite ou json), fora do event loop
+            self.armazenamento = await self.persistencia.executar(criar_armazenamento)
+            self.saldos = await self.persistencia.executar(self.armazenamento.carregar)
+            self.ranking = Ranking(self.saldos)
+        self.escritor = EscritorEmLote(self.armazenamento.gravar_lote)
+        self.tarefa_compactacao = self.bot.loop.create_task(self.compactar_periodicamente())
+
+    async def cog_unload(self):
+        # Grava o que estiver pendente antes de desligar
+        await self.escritor.fechar()
+        # Espera uma compactação em andamento antes de parar a tarefa periódica
+        async with self.trava_compactacao:
+            self.tarefa_compactacao.cancel()
+        if recarga.em_recarga(__name__):
+            # O backend continua aberto e passa para a nova instância
+            recarga.guardar(__name__, {chave: getattr(self, chave) for chave in self.ESTADO_RECARGA})
+            return
+        await self.compactar()
+        await self.persistencia.executar(self.armazenamento.fechar)
+
+    async def cog_before_invoke(self, ctx:commands.Context):
+        # Só uma invocação real gasta um uso: o help roda os checks de todos os comandos,
+        # então o limite não pode ficar no cog_check. Recusa antes da persistência e do embed.
+        self.limitador.verificar(ctx)
+
+    async def cog_command_error(self, ctx:commands.Context, error):
+        if isinstance(error, LimiteExcedido):
+            await ctx.send(f"⏳ Calma! Tente `{error.comando}` novamente em {error.espera:.1f}s.", delete_after=5)
+        else:
+            print(f"Erro no comando {ctx.command}: {str(error)}")
+
+    def copiar_contas(self, *user_ids):
+        """Guarda o estado atual das contas para poder desfazer uma operação"""
+        return {user_id: dict(self.saldos[user_id]) if user_id in self.saldos else None for user_id in user_ids}
+
+    async def save_transaction(self, anteriores, transaction_type, details):
+        """Persiste as contas alteradas e a transação em um único lote
+
+        Se a escrita falhar, as contas voltam ao estado de `anteriores`: a operação
+        é aplicada por inteiro ou não é aplicada. Deve ser chamado com as travas
+        das contas adquiridas.
+        """
+        try:
+            await self.escritor.enfileirar({
+                "contas": {user_id: dict(self.saldos[user_id]) for user_id in anteriores},
+                "transacoes": [(transaction_type, details)]
+            })
+        except Exception:
+            for user_id, conta in anteriores.items():
+                if conta is None:
+                    self.saldos.pop(user_id, None)
+                else:
+                    self.saldos[user_id] = conta
+            raise
+        # O ranking só acompanha alterações que chegaram ao disco
+        for user_id in anteriores:
+            self.ranking.atualizar(user_id, self.saldos[user_id]["saldo_centavos"])
+        if self.armazenamento.precisa_compactar and (self.compactacao is None or self.compactacao.done()):
+            self.compactacao = self.bot.loop.create_task(self.compactar())
+
+    async def compactar(self):
+        """Compacta o armazenamento fora do event loop"""
+        async with self.trava_compactacao:
+            try:
+                if not await self.persistencia.executar(self.armazenamento.iniciar_compactacao):
+                    return
+                # O snapshot é montado pelo backend a partir do disco, não de self.saldos:
+                # uma operação em voo que ainda pode ser desfeita não entra nele
+                await self.persistencia.executar(self.armazenamento.concluir_compactacao)
+            except Exception as e:
+                print(f"Erro ao compactar contas: {str(e)}")
+
+    async def compactar_periodicamente(self):
+        """Compacta o armazenamento a cada 5 minutos"""
+        while True:
+            await asyncio.sleep(300)
+            await self.compactar()
 
     @commands.command()
     async def criarconta(self, ctx:commands.Context):
@@ -48,34 +133,34 @@ class Banco(commands.Cog):
         try:
             user_id = str(ctx.author.id)
             
-            if user_id in self.saldos:
-                await ctx.send("❌ Você já possui uma conta!")
-                return
-
-            # Cria uma conta com saldo inicial aleatório entre 1000 e 5000
-            saldo_inicial = random.randint(1000, 5000)
-            self.saldos[user_id] = {
-                "saldo": saldo_inicial,
-                "criado_em": datetime.now().isoformat(),
-                "ultima_atividade": datetime.now().isoformat()
-            }
-
-            # Salva os dados da conta
-            self.save_accounts()
-
-            # Registra a criação da conta
-            self.log_transaction("CRIACAO_CONTA", {
-                "user_id": user_id,
-                "username": ctx.author.name,
-                "saldo_inicial": saldo_inicial
-            })
+            async with self.travas.adquirir(user_id):
+                if user_id in self.saldos:
+                    await ctx.send("❌ Você já possui uma conta!")
+                    return
+
+                anteriores = self.copiar_contas(user_id)
+
+                # Cria uma conta com saldo inicial aleatório entre R$ 1000 e R$ 5000 (em centavos)
+                saldo_inicial = random.randint(1000, 5000) * 100
+                self.saldos[user_id] = {
+                    "saldo_centavos": saldo_inicial,
+                    "criado_em": datetime.now().isoformat(),
+                    "ultima_atividade": datetime.now().isoformat()
+                }
+
+                # Salva as contas alteradas e registra a transação
+                await self.save_transaction(anteriores, "CRIACAO_CONTA", {
+                    "user_id": user_id,
+                    "username": ctx.author.name,
+                    "saldo_inicial_centavos": saldo_inicial
+                })
 
             embed = discord.Embed(
                 title="🏦 Conta Criada com Sucesso!",
                 description=f"Bem-vindo ao banco simulado, {ctx.author.name}!",
                 color=discord.Color.green()
             )
-            embed.add_field(name="Saldo Inicial", value=f"R$ {saldo_inicial:.2f}")
+            embed.add_field(name="Saldo Inicial", value=formatar_reais(saldo_inicial))
             embed.add_field(name="Data de Criação", value=datetime.now().strftime("%d/%m/%Y %H:%M:%S"))
             embed.set_footer(text=f"ID da Conta: {user_id}")
             
@@ -93,13 +178,13 @@ class Banco(commands.Cog):
                 await ctx.send("❌ Você não possui uma conta! Use `.criarconta` para criar uma.")
                 return
 
-            saldo = self.saldos[user_id]["saldo"]
+            saldo = self.saldos[user_id]["saldo_centavos"]
             embed = discord.Embed(
                 title="💰 Saldo da Conta",
                 color=discord.Color.blue()
             )
             embed.add_field(name="Titular", value=ctx.author.name)
-            embed.add_field(name="Saldo Atual", value=f"R$ {saldo:.2f}")
+            embed.add_field(name="Saldo Atual", value=formatar_reais(saldo))
             embed.add_field(name="Última Atividade", value=datetime.fromisoformat(self.saldos[user_id]["ultima_atividade"]).strftime("%d/%m/%Y %H:%M:%S"))
             
             await ctx.send(embed=embed)
@@ -107,42 +192,46 @@ class Banco(commands.Cog):
             await ctx.send(f"❌ Erro ao verificar saldo: {str(e)}")
 
     @commands.command()
-    async def transferir(self, ctx:commands.Context, membro:discord.Member, valor:float):
+    async def transferir(self, ctx:commands.Context, membro:discord.Member, valor:para_centavos):
         """Transfere dinheiro para outro usuário"""
         try:
             remetente_id = str(ctx.author.id)
             destinatario_id = str(membro.id)
             
-            if remetente_id not in self.saldos or destinatario_id not in self.saldos:
-                await ctx.send("❌ Um dos usuários não possui conta!")
-                return
-
-            if valor <= 0:
-                await ctx.send("❌ O valor da transferência deve ser maior que zero!")
-                return
-
-            if self.saldos[remetente_id]["saldo"] < valor:
-                await ctx.send("❌ Saldo insuficiente para realizar a transferência!")
-                return
-
-            # Realiza a transferência
-            self.saldos[remetente_id]["saldo"] -= valor
-            self.saldos[destinatario_id]["saldo"] += valor
-            self.saldos[remetente_id]["ultima_atividade"] = datetime.now().isoformat()
-            self.saldos[destinatario_id]["ultima_atividade"] = datetime.now().isoformat()
-
-            # Salva as alterações
-            self.save_accounts()
-
-            # Registra a transação
-            self.log_transaction("TRANSFERENCIA", {
-                "remetente_id": remetente_id,
-                "remetente_nome": ctx.author.name,
-                "destinatario_id": destinatario_id,
-                "destinatario_nome": membro.name,
-                "valor": valor,
-                "data": datetime.now().isoformat()
-            })
+            async with self.travas.adquirir(remetente_id, destinatario_id):
+                if remetente_id not in self.saldos or destinatario_id not in self.saldos:
+                    await ctx.send("❌ Um dos usuários não possui conta!")
+                    return
+
+                if valor <= 0:
+                    await ctx.send("❌ O valor da transferência deve ser maior que zero!")
+                    return
+
+                if self.saldos[remetente_id]["saldo_centavos"] < valor:
+                    await ctx.send("❌ Saldo insuficiente para realizar a transferência!")
+                    return
+
+                if not cabe_no_saldo(self.saldos[destinatario_id]["saldo_centavos"], valor):
+                    await ctx.send("❌ O saldo do destinatário passaria do máximo permitido!")
+                    return
+
+                anteriores = self.copiar_contas(remetente_id, destinatario_id)
+
+                # Realiza a transferência
+                self.saldos[remetente_id]["saldo_centavos"] -= valor
+                self.saldos[destinatario_id]["saldo_centavos"] += valor
+                self.saldos[remetente_id]["ultima_atividade"] = datetime.now().isoformat()
+                self.saldos[destinatario_id]["ultima_atividade"] = datetime.now().isoformat()
+
+                # Salva as contas alteradas e registra a transação
+                await self.save_transaction(anteriores, "TRANSFERENCIA", {
+                    "remetente_id": remetente_id,
+                    "remetente_nome": ctx.author.name,
+                    "destinatario_id": destinatario_id,
+                    "destinatario_nome": membro.name,
+                    "valor_centavos": valor,
+                    "data": datetime.now().isoformat()
+                })
 
             embed = discord.Embed(
                 title="💸 Transferência Realizada",
@@ -150,7 +239,7 @@ class Banco(commands.Cog):
             )
             embed.add_field(name="De", value=ctx.author.name)
             embed.add_field(name="Para", value=membro.name)
-            embed.add_field(name="Valor", value=f"R$ {valor:.2f}")
+            embed.add_field(name="Valor", value=formatar_reais(valor))
             embed.add_field(name="Data", value=datetime.now().strftime("%d/%m/%Y %H:%M:%S"))
             
             await ctx.send(embed=embed)
@@ -158,8 +247,8 @@ class Banco(commands.Cog):
             await ctx.send(f"❌ Erro ao realizar transferência: {str(e)}")
 
     @commands.command()
-    async def extrato(self, ctx:commands.Context):
-        """Mostra o extrato das últimas transações"""
+    async def extrato(self, ctx:commands.Context, pagina:int = 1):
+        """Mostra o extrato das transações, 5 por página (1 = mais recentes)"""
         try:
             user_id = str(ctx.author.id)
             
@@ -167,12 +256,14 @@ class Banco(commands.Cog):
                 await ctx.send("❌ Você não possui uma conta!")
                 return
 
-            # Lê o arquivo de log para obter as transações do usuário
-            with open('data/transactions.log', 'r') as f:
-                transacoes = []
-                for line in f:
-                    if user_id in line:
-                        transacoes.append(line.strip())
+            if pagina < 1:
+                await ctx.send("❌ A página deve ser maior que zero!")
+                return
+
+            # Busca a página de transações do usuário no índice do histórico
+            transacoes = await self.persistencia.executar(
+                self.armazenamento.historico, user_id, limite=5, deslocamento=(pagina - 1) * 5
+            )
 
             if not transacoes:
                 await ctx.send("❌ Nenhuma transação encontrada!")
@@ -183,56 +274,60 @@ class Banco(commands.Cog):
                 color=discord.Color.blue()
             )
             
-            # Mostra as últimas 5 transações
-            for transacao in transacoes[-5:]:
+            for data, descricao in transacoes:
                 embed.add_field(
-                    name=transacao.split(" - ")[0],
-                    value=transacao.split(" - ")[1],
+                    name=datetime.fromisoformat(data).strftime("%d/%m/%Y %H:%M:%S"),
+                    value=descricao,
                     inline=False
                 )
 
-            embed.set_footer(text=f"Saldo Atual: R$ {self.saldos[user_id]['saldo']:.2f}")
+            embed.set_footer(text=f"Página {pagina} • Saldo Atual: {formatar_reais(self.saldos[user_id]['saldo_centavos'])}")
             
             await ctx.send(embed=embed)
         except Exception as e:
             await ctx.send(f"❌ Erro ao gerar extrato: {str(e)}")
 
     @commands.command()
-    async def depositar(self, ctx:commands.Context, valor:float):
+    async def depositar(self, ctx:commands.Context, valor:para_centavos):
         """Simula um depósito na conta"""
         try:
             user_id = str(ctx.author.id)
             
-            if user_id not in self.saldos:
-                await ctx.send("❌ Você não possui uma conta!")
-                return
-
-            if valor <= 0:
-                await ctx.send("❌ O valor do depósito deve ser maior que zero!")
-                return
-
-            # Realiza o depósito
-            self.saldos[user_id]["saldo"] += valor
-            self.saldos[user_id]["ultima_atividade"] = datetime.now().isoformat()
-
-            # Salva as alterações
-            self.save_accounts()
-
-            # Registra a transação
-            self.log_transaction("DEPOSITO", {
-                "user_id": user_id,
-                "username": ctx.author.name,
-                "valor": valor,
-                "data": datetime.now().isoformat()
-            })
+            async with self.travas.adquirir(user_id):
+                if user_id not in self.saldos:
+                    await ctx.send("❌ Você não possui uma conta!")
+                    return
+
+                if valor <= 0:
+                    await ctx.send("❌ O valor do depósito deve ser maior que zero!")
+                    return
+
+                if not cabe_no_saldo(self.saldos[user_id]["saldo_centavos"], valor):
+                    await ctx.send("❌ O saldo passaria do máximo permitido!")
+                    return
+
+                anteriores = self.copiar_contas(user_id)
+
+                # Realiza o depósito
+                self.saldos[user_id]["saldo_centavos"] += valor
+                self.saldos[user_id]["ultima_atividade"] = datetime.now().isoformat()
+
+                # Salva as contas alteradas e registra a transação
+                await self.save_transaction(anteriores, "DEPOSITO", {
+                    "user_id": user_id,
+                    "username": ctx.author.name,
+                    "valor_centavos": valor,
+                    "data": datetime.now().isoformat()
+                })
+                novo_saldo = self.saldos[user_id]['saldo_centavos']
 
             embed = discord.Embed(
                 title="💰 Depósito Realizado",
                 color=discord.Color.green()
             )
             embed.add_field(name="Titular", value=ctx.author.name)
-            embed.add_field(name="Valor", value=f"R$ {valor:.2f}")
-            embed.add_field(name="Novo Saldo", value=f"R$ {self.saldos[user_id]['saldo']:.2f}")
+            embed.add_field(name="Valor", value=formatar_reais(valor))
+            embed.add_field(name="Novo Saldo", value=formatar_reais(novo_saldo))
             embed.add_field(name="Data", value=datetime.now().strftime("%d/%m/%Y %H:%M:%S"))
             
             await ctx.send(embed=embed)
@@ -244,97 +339,138 @@ class Banco(commands.Cog):
         try:
             user_id = str(ctx.author.id)
             
-            if user_id not in self.saldos:
-                await ctx.send("❌ Você não possui uma conta!")
-                return
+            async with self.travas.adquirir(user_id):
+                if user_id not in self.saldos:
+                    await ctx.send("❌ Você não possui uma conta!")
+                    return
+
+                # Gera um valor aleatório entre R$ 100 e R$ 1000 (em centavos)
+                valor = random.randint(100, 1000) * 100
 
-            # Gera um valor aleatório entre 100 e 1000
-            valor = random.randint(100, 1000)
+                if not cabe_no_saldo(self.saldos[user_id]["saldo_centavos"], valor):
+                    await ctx.send("❌ O saldo passaria do máximo permitido!")
+                    return
+
+                anteriores = self.copiar_contas(user_id)
             
-            # Adiciona o valor ao saldo
-            self.saldos[user_id]["saldo"] += valor
-            self.saldos[user_id]["ultima_atividade"] = datetime.now().isoformat()
-
-            # Salva as alterações
-            self.save_accounts()
-
-            # Registra a transação
-            self.log_transaction("TRABALHO", {
-                "user_id": user_id,
-                "username": ctx.author.name,
-                "valor": valor,
-                "data": datetime.now().isoformat()
-            })
+                # Adiciona o valor ao saldo
+                self.saldos[user_id]["saldo_centavos"] += valor
+                self.saldos[user_id]["ultima_atividade"] = datetime.now().isoformat()
+
+                # Salva as contas alteradas e registra a transação
+                await self.save_transaction(anteriores, "TRABALHO", {
+                    "user_id": user_id,
+                    "username": ctx.author.name,
+                    "valor_centavos": valor,
+                    "data": datetime.now().isoformat()
+                })
+                novo_saldo = self.saldos[user_id]['saldo_centavos']
 
             embed = discord.Embed(
                 title="💼 Trabalho Concluído",
-                description=f"Você trabalhou duro e ganhou R$ {valor:.2f}!",
+                description=f"Você trabalhou duro e ganhou {formatar_reais(valor)}!",
                 color=discord.Color.green()
             )
-            embed.add_field(name="Novo Saldo", value=f"R$ {self.saldos[user_id]['saldo']:.2f}")
+            embed.add_field(name="Novo Saldo", value=formatar_reais(novo_saldo))
             
             await ctx.send(embed=embed)
         except Exception as e:
             await ctx.send(f"❌ Erro ao trabalhar: {str(e)}")
 
     @commands.command()
-    async def jackpot(self, ctx:commands.Context, valor:float):
+    async def jackpot(self, ctx:commands.Context, valor:para_centavos):
         """Aposta um valor no jackpot"""
         try:
             user_id = str(ctx.author.id)
             
-            if user_id not in self.saldos:
-                await ctx.send("❌ Você não possui uma conta!")
-                return
-
-            if valor <= 0:
-                await ctx.send("❌ O valor da aposta deve ser maior que zero!")
-                return
-
-            if valor > self.saldos[user_id]["saldo"]:
-                await ctx.send("❌ Saldo insuficiente para realizar esta aposta!")
-                return
-
-            # 30% de chance de ganhar
-            ganhou = random.random() < 0.30
-
-            if ganhou:
-                # Ganha 2x o valor apostado
-                premio = valor * 2
-                self.saldos[user_id]["saldo"] += premio - valor
-                resultado = f"🎉 Você ganhou R$ {premio:.2f}!"
-                cor = discord.Color.green()
-            else:
-                # Perde o valor apostado
-                self.saldos[user_id]["saldo"] -= valor
-                resultado = "😢 Você perdeu!"
-                cor = discord.Color.red()
-
-            self.saldos[user_id]["ultima_atividade"] = datetime.now().isoformat()
-
-            # Salva as alterações
-            self.save_accounts()
-
-            # Registra a transação
-            self.log_transaction("JACKPOT", {
-                "user_id": user_id,
-                "username": ctx.author.name,
-                "valor_apostado": valor,
-                "ganhou": ganhou,
-                "data": datetime.now().isoformat()
-            })
+            async with self.travas.adquirir(user_id):
+                if user_id not in self.saldos:
+                    await ctx.send("❌ Você não possui uma conta!")
+                    return
+
+                if valor <= 0:
+                    await ctx.send("❌ O valor da aposta deve ser maior que zero!")
+                    return
+
+                if valor > self.saldos[user_id]["saldo_centavos"]:
+                    await ctx.send("❌ Saldo insuficiente para realizar esta aposta!")
+                    return
+
+                # O prêmio soma o valor apostado ao saldo
+                if not cabe_no_saldo(self.saldos[user_id]["saldo_centavos"], valor):
+                    await ctx.send("❌ O prêmio faria o saldo passar do máximo permitido!")
+                    return
+
+                anteriores = self.copiar_contas(user_id)
+
+                # 30% de chance de ganhar
+                ganhou = random.random() < 0.30
+
+                if ganhou:
+                    # Ganha 2x o valor apostado
+                    premio = valor * 2
+                    self.saldos[user_id]["saldo_centavos"] += premio - valor
+                    resultado = f"🎉 Você ganhou {formatar_reais(premio)}!"
+                    cor = discord.Color.green()
+                else:
+                    # Perde o valor apostado
+                    self.saldos[user_id]["saldo_centavos"] -= valor
+                    resultado = "😢 Você perdeu!"
+                    cor = discord.Color.red()
+
+                self.saldos[user_id]["ultima_atividade"] = datetime.now().isoformat()
+
+                # Salva as contas alteradas e registra a transação
+                await self.save_transaction(anteriores, "JACKPOT", {
+                    "user_id": user_id,
+                    "username": ctx.author.name,
+                    "valor_apostado_centavos": valor,
+                    "ganhou": ganhou,
+                    "data": datetime.now().isoformat()
+                })
+                novo_saldo = self.saldos[user_id]['saldo_centavos']
 
             embed = discord.Embed(
                 title="🎰 Jackpot",
                 description=resultado,
                 color=cor
             )
-            embed.add_field(name="Valor Apostado", value=f"R$ {valor:.2f}")
-            embed.add_field(name="Novo Saldo", value=f"R$ {self.saldos[user_id]['saldo']:.2f}")
+            embed.add_field(name="Valor Apostado", value=formatar_reais(valor))
+            embed.add_field(name="Novo Saldo", value=formatar_reais(novo_saldo))
             
             await ctx.send(embed=embed)
         except Exception as e:
             await ctx.send(f"❌ Erro ao apostar no jackpot: {str(e)}")
 
+    @commands.command(aliases=["top"])
+    async def rank(self, ctx:commands.Context, quantidade:int = 10):
+        """Mostra as maiores contas do banco e a sua posição"""
+        try:
+            quantidade = max(1, min(quantidade, 25))
+            topo = self.ranking.topo(quantidade)
+
+            if not topo:
+                await ctx.send("❌ Nenhuma conta encontrada!")
+                return
+
+            embed = discord.Embed(
+                title="🏆 Ranking do Banco",
+                description="\n".join(
+                    f"**{posicao}.** <@{user_id}> — {formatar_reais(saldo)}"
+                    for posicao, (user_id, saldo) in enumerate(topo, start=1)
+                ),
+                color=discord.Color.gold()
+            )
+
+            posicao = self.ranking.posicao(str(ctx.author.id))
+            if posicao is None:
+                embed.set_footer(text="Você ainda não possui uma conta")
+            else:
+                embed.set_footer(text=f"Sua posição: {posicao}º de {len(self.ranking)}")
+
+            await ctx.send(embed=embed)
+        except Exception as e:
+            await ctx.send(f"❌ Erro ao gerar ranking: {str(e)}")
+
 async def setup(bot):
     await bot.add_cog(Banco(bot)) 
\ No newline at end of file
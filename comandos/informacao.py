@@ -1,6 +1,9 @@
 import discord
 from discord.ext import commands
 
+# Intents usados no modo enxuto; sem presences o status vem da API (veja serverinfo)
+INTENTS = ["members"]
+
 class Informacao(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -21,7 +24,9 @@ class Informacao(commands.Cog):
             newembed.add_field(name="Entrou em", value=member.joined_at.strftime("%d/%m/%Y %H:%M:%S"))
             newembed.add_field(name="Bot?", value=member.bot)
             newembed.add_field(name="Top role", value=member.top_role)
-            newembed.add_field(name="Status", value=member.status)
+            # Sem o intent de presences o discord.py sempre mostraria "offline"
+            status = member.status if self.bot.intents.presences else "Indisponível"
+            newembed.add_field(name="Status", value=status)
             
             await ctx.reply(embed=newembed)
         except Exception as e:
@@ -31,9 +36,23 @@ class Informacao(commands.Cog):
     async def serverinfo(self, ctx:commands.Context):
         try:
             server = ctx.guild
-            online = len([m for m in server.members if m.status == discord.Status.online])
-            offline = len([m for m in server.members if m.status == discord.Status.offline])
-            dnd = len([m for m in server.members if m.status == discord.Status.dnd])
+            if self.bot.intents.presences and self.bot.intents.members:
+                online = len([m for m in server.members if m.status == discord.Status.online])
+                offline = len([m for m in server.members if m.status == discord.Status.offline])
+                dnd = len([m for m in server.members if m.status == discord.Status.dnd])
+                status_membros = (
+                    f"🟢 **Online**: ``{online}``\n"
+                    f"⭕ **Offline**: ``{offline}``\n"
+                    f"🔴 **Não perturbe**: ``{dnd}``\n"
+                    f"📊 **Total**: ``{server.member_count}``"
+                )
+            else:
+                # Modo enxuto: sem presences nem cache de membros, a API devolve contagens aproximadas
+                contagem = await self.bot.fetch_guild(server.id, with_counts=True)
+                status_membros = (
+                    f"🟢 **Online (aprox.)**: ``{contagem.approximate_presence_count}``\n"
+                    f"📊 **Total (aprox.)**: ``{contagem.approximate_member_count}``"
+                )
             
             newembed = discord.Embed(color=discord.Color.blue())
             newembed.title = "📊 Informações do Servidor"
@@ -48,11 +67,7 @@ class Informacao(commands.Cog):
             newembed.add_field(name="📅 Criado em", value=server.created_at.strftime("%d/%m/%Y %H:%M:%S"), inline=True)
             
             # Status dos membros
-            newembed.add_field(name="👥 Status dos Membros", value=
-                f"🟢 **Online**: ``{online}``\n"
-                f"⭕ **Offline**: ``{offline}``\n"
-                f"🔴 **Não perturbe**: ``{dnd}``\n"
-                f"📊 **Total**: ``{server.member_count}``", inline=False)
+            newembed.add_field(name="👥 Status dos Membros", value=status_membros, inline=False)
             
             # Canais
             newembed.add_field(name="💬 Canais de Texto", value=len(server.text_channels), inline=True)
@@ -1,6 +1,9 @@
 import discord
 from discord.ext import commands
 
+# Intents usados no modo enxuto: kick, ban e mute resolvem discord.Member
+INTENTS = ["members"]
+
 class Moderacao(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
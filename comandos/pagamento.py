@@ -1,41 +1,79 @@
 import discord
 from discord.ext import commands
-import aiohttp
 import json
 import asyncio
 from discord import ui
-import qrcode
 from io import BytesIO
 import base64
 from datetime import datetime, timedelta
 import os
-import pandas as pd
+import heapq
+import uuid
 from pathlib import Path
+from nucleo.dinheiro import formatar_reais, para_centavos, para_reais
+from nucleo.persistencia import EscritorEmLote, obter_persistencia
+from nucleo.http import CircuitoAberto, ClienteHTTP
+from nucleo.webhook import ReceptorWebhook
+from nucleo.loja import ArmazenamentoLoja
+from nucleo.qr import gerar_qrcode
+from nucleo.reservas import Reservas
+from nucleo.vendas import AgregadosVendas, resumo_pandas
+from nucleo import recarga
+
+# Só usa mensagens e interações, já cobertas pelos intents básicos do main.py
+INTENTS = []
+
+# Consultas simultâneas à API de pagamentos
+LIMITE_CONSULTAS = 20
+# Intervalo entre ciclos do verificador, em segundos
+INTERVALO_CICLO = 5
+# (idade máxima do pagamento, intervalo entre consultas), em segundos
+INTERVALOS_VERIFICACAO = [(120, 5), (600, 15), (1800, 60), (float("inf"), 300)]
+# Com o webhook ativo, a consulta periódica só reconcilia notificações perdidas
+INTERVALO_RECONCILIACAO = 120
+# Validade do PIX pedida ao Mercado Pago; pagamentos vencidos deixam de ser consultados
+VALIDADE_PIX = timedelta(minutes=30)
+# Folga da reserva sobre a validade do PIX, para aprovações que chegam no limite
+MARGEM_RESERVA = timedelta(minutes=5)
+# Por quanto tempo um PIX vencido cuja consulta final falhou continua sendo consultado
+# antes de expirar sem resposta (menor que MARGEM_RESERVA, para a reserva ainda valer)
+TOLERANCIA_EXPIRACAO = timedelta(minutes=3)
+# Intervalo entre as novas consultas finais de um PIX vencido, em segundos
+INTERVALO_CONSULTA_FINAL = 30
+# QR Code compacto (módulos menores, PNG de 1 bit); QRCODE_COMPACTO=0 volta ao tamanho original
+QRCODE_COMPACTO = os.getenv("QRCODE_COMPACTO", "1") != "0"
+# Opções por página do menu de compra (limite do Discord) e produtos por página do comando loja
+PRODUTOS_POR_MENU = 25
+PRODUTOS_POR_PAGINA = 10
+# Espera para agrupar alterações do catálogo antes de editar os menus publicados, em segundos
+ESPERA_ATUALIZACAO_MENUS = 3
+# Edições simultâneas de menus publicados
+LIMITE_EDICOES = 5
 
 class ProdutoSelect(discord.ui.Select):
-    def __init__(self, produtos, cog):
-        options = []
-        for produto_id, produto in produtos.items():
-            options.append(
-                discord.SelectOption(
-                    label=f"{produto['nome']} - R$ {produto['preco']:.2f}",
-                    value=produto_id,
-                    description=f"Estoque: {produto['estoque']}"
-                )
-            )
+    def __init__(self, cog, pagina):
+        options = [
+            discord.SelectOption(label=label, value=produto_id, description=descricao)
+            for produto_id, label, descricao in cog.opcoes_menu(pagina)
+        ]
         super().__init__(
             placeholder="Selecione um produto",
             min_values=1,
             max_values=1,
-            options=options
+            options=options or [discord.SelectOption(label="Nenhum produto disponível", value="0")],
+            disabled=not options,
+            custom_id="loja:menu:produto"
         )
         self.cog = cog
 
     async def callback(self, interaction: discord.Interaction):
         produto_id = self.values[0]
-        produto = self.cog.produtos[produto_id]
+        produto = self.cog.produtos.get(produto_id)
+        if produto is None:
+            await interaction.response.send_message("❌ Este produto não está mais à venda!", ephemeral=True)
+            return
         
-        if produto["estoque"] <= 0:
+        if self.cog.reservas.disponivel(produto) <= 0:
             await interaction.response.send_message("❌ Este produto está fora de estoque!", ephemeral=True)
             return
 
@@ -53,7 +91,7 @@ class ProdutoSelect(discord.ui.Select):
 
         embed = discord.Embed(
             title="🛒 Carrinho",
-            description=f"**Produto:** {produto['nome']}\n**Preço:** R$ {produto['preco']:.2f}\n**Descrição:** {produto['descricao']}",
+            description=f"**Produto:** {produto['nome']}\n**Preço:** {formatar_reais(produto['preco_centavos'])}\n**Descrição:** {produto['descricao']}",
             color=discord.Color.blue()
         )
 
@@ -61,10 +99,54 @@ class ProdutoSelect(discord.ui.Select):
         await channel.send(f"{interaction.user.mention}", embed=embed, view=view)
         await interaction.response.send_message(f"✅ Canal de compra criado: {channel.mention}", ephemeral=True)
 
+class PaginaButton(discord.ui.Button):
+    """Botão que troca a página de um menu paginado"""
+
+    def __init__(self, label, pagina, disabled, custom_id=None):
+        super().__init__(label=label, style=discord.ButtonStyle.gray, disabled=disabled, custom_id=custom_id)
+        self.pagina = pagina
+
+    async def callback(self, interaction: discord.Interaction):
+        await self.view.mudar_pagina(interaction, self.pagina)
+
 class ProdutoView(discord.ui.View):
-    def __init__(self, produtos, cog):
+    """Menu de compra com até 25 produtos por página
+
+    Persistente: os custom_ids são fixos e a página vem da própria instância,
+    registrada por mensagem com `bot.add_view`, então o menu continua
+    funcionando depois de um reinício.
+    """
+
+    def __init__(self, cog, pagina=0):
         super().__init__(timeout=None)
-        self.add_item(ProdutoSelect(produtos, cog))
+        self.cog = cog
+        total = cog.total_paginas(PRODUTOS_POR_MENU)
+        self.pagina = min(pagina, total - 1)
+        self.add_item(ProdutoSelect(cog, self.pagina))
+        if total > 1:
+            self.add_item(PaginaButton("◀", self.pagina - 1, self.pagina == 0, "loja:menu:anterior"))
+            self.add_item(PaginaButton("▶", self.pagina + 1, self.pagina == total - 1, "loja:menu:proxima"))
+
+    async def mudar_pagina(self, interaction, pagina):
+        view = ProdutoView(self.cog, pagina)
+        await interaction.response.edit_message(view=view)
+        await self.cog.registrar_menu(interaction.message, view.pagina)
+
+class LojaView(discord.ui.View):
+    """Navegação entre as páginas do comando loja"""
+
+    def __init__(self, cog, pagina=0):
+        super().__init__(timeout=300)
+        self.cog = cog
+        total = cog.total_paginas(PRODUTOS_POR_PAGINA)
+        self.pagina = min(pagina, total - 1)
+        if total > 1:
+            self.add_item(PaginaButton("◀", self.pagina - 1, self.pagina == 0))
+            self.add_item(PaginaButton("▶", self.pagina + 1, self.pagina == total - 1))
+
+    async def mudar_pagina(self, interaction, pagina):
+        view = LojaView(self.cog, pagina)
+        await interaction.response.edit_message(embed=self.cog.embed_loja(view.pagina), view=view)
 
 class PagamentoView(ui.View):
     def __init__(self, produto_id, produto, cog, channel):
@@ -73,6 +155,9 @@ class PagamentoView(ui.View):
         self.produto = produto
         self.cog = cog
         self.channel = channel
+        self.payment_id = None
+        self.reserva = None
+        self.cancelado = False
 
     @discord.ui.button(label="Pagar com PIX", style=discord.ButtonStyle.green)
     async def pagar_pix(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -80,74 +165,85 @@ class PagamentoView(ui.View):
         button.disabled = True
         await interaction.response.edit_message(view=self)
 
+        # Reservar uma unidade antes de gerar a cobrança: sem estoque, nenhum PIX é criado
+        reserva = await self.cog.reservar_estoque(self.produto_id, interaction.user.id)
+        if reserva is None:
+            await interaction.followup.send("❌ Este produto está fora de estoque!")
+            return
+        self.reserva = reserva
+        if self.cancelado:
+            await self.cog.liberar_reservas([reserva])
+            return
+
         # Gerar pagamento PIX
         pagamento = await self.cog.gerar_pix(
             self.produto["nome"],
-            self.produto["preco"],
+            self.produto["preco_centavos"],
             interaction.user.name
         )
 
-        if pagamento:
-            try:
-                # Criar QR Code
-                qr = qrcode.QRCode(
-                    version=1,
-                    error_correction=qrcode.constants.ERROR_CORRECT_L,
-                    box_size=10,
-                    border=4,
-                )
-                qr.add_data(pagamento['qr_code'])
-                qr.make(fit=True)
-                
-                # Converter QR Code para imagem
-                img = qr.make_image(fill_color="black", back_color="white")
-                
-                # Salvar a imagem em um buffer
-                buffered = BytesIO()
-                img.save(buffered, format="PNG", quality=100)
-                buffered.seek(0)
-                
-                # Criar o embed
-                embed = discord.Embed(
-                    title="💰 Pagamento PIX",
-                    description=f"**Produto:** {self.produto['nome']}\n**Valor:** R$ {self.produto['preco']:.2f}",
-                    color=discord.Color.green(),
-                    timestamp=datetime.now()
-                )
-                
-                embed.add_field(
-                    name="QR Code PIX",
-                    value=f"```{pagamento['qr_code']}```"
-                )
-                embed.add_field(
-                    name="Código PIX",
-                    value=f"```{pagamento['pix_code']}```"
-                )
-                
-                # Enviar a imagem como arquivo
-                file = discord.File(buffered, filename="qrcode.png")
-                embed.set_image(url="attachment://qrcode.png")
-                embed.set_footer(text="Escaneie o QR Code ou copie o código PIX para pagar")
-                
-                # Registrar pagamento pendente
-                self.cog.pagamentos_pendentes[pagamento['id']] = {
-                    'produto_id': self.produto_id,
-                    'valor': self.produto['preco'],
-                    'usuario': interaction.user.id,
-                    'canal': self.channel.id,
-                    'timestamp': datetime.now()
-                }
-
-                await interaction.followup.send(embed=embed, file=file)
-            except Exception as e:
-                print(f"Erro ao gerar QR Code: {str(e)}")
-                await interaction.followup.send("❌ Erro ao gerar QR Code. Por favor, tente novamente.")
-        else:
+        if self.cancelado:
+            # Cancelado enquanto o PIX era gerado: cancelar já liberou a reserva e o canal
+            # vai ser apagado, então a cobrança não é registrada e vence sozinha no Mercado Pago
+            return
+        if not pagamento:
+            await self.cog.liberar_reservas([reserva])
             await interaction.followup.send("❌ Erro ao gerar pagamento PIX!")
+            return
+
+        # Registrar pagamento pendente junto com a reserva que ele segura
+        self.payment_id = str(pagamento['id'])
+        await self.cog.registrar_pendente(self.payment_id, {
+            'produto_id': self.produto_id,
+            'produto_nome': self.produto['nome'],
+            'valor_centavos': self.produto['preco_centavos'],
+            'usuario': interaction.user.id,
+            'canal': self.channel.id,
+            'timestamp': datetime.now(),
+            'expira_em': pagamento['expira_em'],
+            'reserva': reserva
+        })
+
+        try:
+            # Gerar a imagem do QR Code no executor, fora do event loop
+            png = await self.cog.persistencia.executar(gerar_qrcode, pagamento['qr_code'], QRCODE_COMPACTO)
+            buffered = BytesIO(png)
+            
+            # Criar o embed
+            embed = discord.Embed(
+                title="💰 Pagamento PIX",
+                description=f"**Produto:** {self.produto['nome']}\n**Valor:** {formatar_reais(self.produto['preco_centavos'])}",
+                color=discord.Color.green(),
+                timestamp=datetime.now()
+            )
+            
+            embed.add_field(
+                name="QR Code PIX",
+                value=f"```{pagamento['qr_code']}```"
+            )
+            embed.add_field(
+                name="Código PIX",
+                value=f"```{pagamento['pix_code']}```"
+            )
+            
+            # Enviar a imagem como arquivo
+            file = discord.File(buffered, filename="qrcode.png")
+            embed.set_image(url="attachment://qrcode.png")
+            embed.set_footer(text="Escaneie o QR Code ou copie o código PIX para pagar")
+
+            await interaction.followup.send(embed=embed, file=file)
+        except Exception as e:
+            print(f"Erro ao gerar QR Code: {str(e)}")
+            await interaction.followup.send("❌ Erro ao gerar QR Code. Por favor, tente novamente.")
 
     @discord.ui.button(label="Cancelar", style=discord.ButtonStyle.red)
     async def cancelar(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.cancelado = True
         await interaction.response.edit_message(content="Compra cancelada!", embed=None, view=None)
+        if self.payment_id:
+            await self.cog.cancelar_pagamento(self.payment_id)
+        elif self.reserva:
+            await self.cog.liberar_reservas([self.reserva])
         await asyncio.sleep(5)
         await self.channel.delete()
 
@@ -179,101 +275,343 @@ class ProdutoForm(discord.ui.Modal, title='Adicionar Novo Produto'):
 
     async def on_submit(self, interaction: discord.Interaction):
         try:
-            preco = float(self.preco.value)
+            preco = para_centavos(self.preco.value)
             estoque = int(self.estoque.value)
             
-            produto_id = str(len(self.cog.produtos) + 1)
             dados_produto = {
-                "id": produto_id,
                 "nome": self.nome.value,
-                "preco": preco,
+                "preco_centavos": preco,
                 "estoque": estoque,
                 "descricao": self.descricao.value,
                 "data_criacao": datetime.now().isoformat()
             }
             
-            self.cog.produtos[produto_id] = dados_produto
-            self.cog.salvar_produto(produto_id, dados_produto)
+            # O catálogo aloca o ID; IDs de produtos removidos nunca são reaproveitados
+            produto_id = await self.cog.criar_produto(dados_produto)
 
             embed = discord.Embed(
                 title=f"🛍️ {self.nome.value}",
                 description=self.descricao.value,
                 color=discord.Color.blue()
             )
-            embed.add_field(name="Preço", value=f"R$ {preco:.2f}", inline=True)
+            embed.add_field(name="Preço", value=formatar_reais(preco), inline=True)
             embed.add_field(name="Estoque", value=str(estoque), inline=True)
             embed.set_footer(text="Use o menu abaixo para selecionar e comprar")
 
-            view = ProdutoView(self.cog.produtos, self.cog)
-            await interaction.channel.send(embed=embed, view=view)
+            view = ProdutoView(self.cog)
+            mensagem = await interaction.channel.send(embed=embed, view=view)
+            await self.cog.registrar_menu(mensagem, view.pagina)
             await interaction.response.send_message(f"✅ Produto '{self.nome.value}' postado com sucesso! ID: {produto_id}", ephemeral=True)
             
         except ValueError:
             await interaction.response.send_message("❌ Erro: Preço e estoque devem ser números válidos!", ephemeral=True)
 
 class Pagamento(commands.Cog):
+    # Estado vivo entregue à nova instância quando a extensão é recarregada
+    ESTADO_RECARGA = (
+        "loja", "produtos", "pagamentos_pendentes", "expiracoes", "reservas", "agregados",
+        "menus", "cliente", "webhook", "semaforo_consultas", "tarefas_canais"
+    )
+
     def __init__(self, bot):
         self.bot = bot
-        self.mercadopago_access_token = "TEST-4628755507678002-032414-d41fb55e08daccae2b9fc9a2717a19fb-2243475468" 
-        self.mercadopago_api_url = "https://api.mercadopago.com/v1"
+        self.mercadopago_access_token = os.getenv("MERCADOPAGO_ACCESS_TOKEN", "TEST-4628755507678002-032414-d41fb55e08daccae2b9fc9a2717a19fb-2243475468")
+        self.mercadopago_api_url = os.getenv("MERCADOPAGO_API_URL", "https://api.mercadopago.com/v1")
         self.produtos = {}
         self.pagamentos_pendentes = {}
+        # Heap (expira_em, payment_id): os vencidos saem sem percorrer todos os pendentes
+        self.expiracoes = []
+        self.reservas = Reservas()
+
+        # Catálogo em cache por versão; a versão muda a cada alteração de produto ou estoque
+        self.versao_catalogo = 0
+        self.cache_catalogo = {}
+        # Menus de compra publicados: message_id -> {'canal', 'pagina'}
+        self.menus = {}
+        self.tarefa_menus = None
+        self.semaforo_edicoes = asyncio.Semaphore(LIMITE_EDICOES)
         self.data_dir = Path("data")
-        self.produtos_dir = self.data_dir / "produtos"
         self.transacoes_dir = self.data_dir / "transacoes"
-        
-        # Carregar produtos existentes
-        self.carregar_produtos()
-        self.bot.loop.create_task(self.verificar_pagamentos())
+        self.agregados = AgregadosVendas(str(self.data_dir / "vendas_agregadas.json"))
+
+        # Escritas em disco agrupadas e executadas fora do event loop
+        self.persistencia = obter_persistencia()
+        self.escritor_produtos = EscritorEmLote(self.gravar_produtos)
+        self.escritor_transacoes = EscritorEmLote(self.gravar_transacoes)
+
+        # Cliente HTTP único para a API de pagamentos, com conexões reaproveitadas
+        self.cliente = ClienteHTTP(
+            self.mercadopago_api_url,
+            headers={"Authorization": f"Bearer {self.mercadopago_access_token}"},
+            timeout_total=float(os.getenv("MERCADOPAGO_TIMEOUT", "10"))
+        )
+
+        # Verificação de pagamentos concorrente, limitada pelo semáforo
+        self.semaforo_consultas = asyncio.Semaphore(LIMITE_CONSULTAS)
+        self.tarefas_canais = set()
+        self.encerrado = False
+        self.tarefa_verificacao = self.bot.loop.create_task(self.verificar_pagamentos())
+
+        # Webhook opcional: ativo quando MERCADOPAGO_WEBHOOK_PORTA e o segredo estão configurados
+        self.webhook = None
+        porta = os.getenv("MERCADOPAGO_WEBHOOK_PORTA")
+        segredo = os.getenv("MERCADOPAGO_WEBHOOK_SEGREDO")
+        if porta and segredo:
+            self.webhook = ReceptorWebhook(segredo, self.notificacao_pagamento, int(porta))
+
+    async def cog_load(self):
+        estado = recarga.retomar(__name__)
+        if estado:
+            # Recarga: assume o estado da instância anterior sem ler nada do disco
+            for chave in self.ESTADO_RECARGA:
+                setattr(self, chave, estado[chave])
+            if self.webhook:
+                self.webhook.ao_notificar = self.notificacao_pagamento
+            self.religar_views()
+            # A atualização de menus que a instância antiga cancelou é refeita com as views novas
+            if estado.get("menus_pendentes"):
+                self.catalogo_alterado()
+            return
+
+        await self.persistencia.executar(self.transacoes_dir.mkdir, parents=True, exist_ok=True)
+
+        # Carregar o catálogo de produtos do loja.db
+        self.loja = await self.persistencia.executar(ArmazenamentoLoja, str(self.data_dir / "loja.db"), str(self.data_dir / "produtos"))
+        self.produtos = await self.persistencia.executar(self.loja.carregar_produtos)
+        await self.persistencia.executar(self.migrar_transacoes)
+        await self.persistencia.executar(self.agregados.carregar, self.ler_dias_gravados)
+
+        # Retomar os pagamentos que estavam em andamento antes do reinício
+        self.pagamentos_pendentes = await self.persistencia.executar(self.loja.carregar_pendentes)
+        self.expiracoes = [(info['expira_em'], payment_id) for payment_id, info in self.pagamentos_pendentes.items()]
+        heapq.heapify(self.expiracoes)
+        self.reservas.carregar(await self.persistencia.executar(self.loja.carregar_reservas))
+
+        # Religar os menus publicados e o botão de cadastro, sem buscar as mensagens
+        self.menus = await self.persistencia.executar(self.loja.carregar_menus)
+        self.religar_views()
 
-    def carregar_produtos(self):
-        """Carrega produtos do diretório de dados"""
-        for arquivo in self.produtos_dir.glob("*.json"):
+        if self.webhook:
             try:
-                with open(arquivo, 'r', encoding='utf-8') as f:
-                    produto = json.load(f)
-                    self.produtos[produto['id']] = produto
+                await self.webhook.iniciar()
             except Exception as e:
-                print(f"Erro ao carregar produto {arquivo}: {str(e)}")
+                print(f"Erro ao iniciar webhook de pagamentos, usando só a consulta periódica: {str(e)}")
+                self.webhook = None
+
+    async def cog_unload(self):
+        # Garante que produtos e transações pendentes cheguem ao disco
+        await self.escritor_produtos.fechar()
+        await self.escritor_transacoes.fechar()
+
+        # Uma atualização de menus agendada editaria as mensagens com views desta instância
+        menus_pendentes = self.tarefa_menus is not None and not self.tarefa_menus.done()
+        if menus_pendentes:
+            self.tarefa_menus.cancel()
+
+        if recarga.em_recarga(__name__):
+            # O verificador antigo termina o ciclo em andamento e para; o novo assume os pagamentos
+            self.encerrado = True
+            estado = {chave: getattr(self, chave) for chave in self.ESTADO_RECARGA}
+            estado["menus_pendentes"] = menus_pendentes
+            recarga.guardar(__name__, estado)
+            return
+
+        self.tarefa_verificacao.cancel()
+        if self.webhook:
+            await self.webhook.fechar()
+        await self.cliente.fechar()
+        await self.persistencia.executar(self.loja.fechar)
 
-    def salvar_produto(self, produto_id, dados):
-        """Salva um produto no diretório de dados"""
-        arquivo = self.produtos_dir / f"{produto_id}.json"
+    def religar_views(self):
+        """Liga as views persistentes a esta instância, sem buscar as mensagens"""
+        for message_id, menu in self.menus.items():
+            self.bot.add_view(ProdutoView(self, menu['pagina']), message_id=message_id)
+        self.bot.add_view(ProdutoFormView(self))
+
+    async def salvar_produto(self, produto_id, dados):
+        """Salva um produto no catálogo (dados=None remove o produto)"""
         try:
-            with open(arquivo, 'w', encoding='utf-8') as f:
-                json.dump(dados, f, ensure_ascii=False, indent=4)
+            await self.escritor_produtos.enfileirar((produto_id, dict(dados) if dados is not None else None))
         except Exception as e:
             print(f"Erro ao salvar produto {produto_id}: {str(e)}")
 
-    def registrar_transacao(self, transacao):
+    def gravar_produtos(self, lote):
+        """Grava um lote de alterações do catálogo em uma única transação"""
+        self.loja.gravar_produtos(lote)
+
+    async def criar_produto(self, dados):
+        """Cadastra um produto novo com o próximo ID do catálogo e o retorna"""
+        produto_id = await self.persistencia.executar(self.loja.criar_produto, dados)
+        self.produtos[produto_id] = dict(dados, id=produto_id)
+        self.catalogo_alterado()
+        return produto_id
+
+    def catalogo(self):
+        """Produtos do catálogo com o disponível, montados uma vez por versão"""
+        if 'itens' not in self.cache_catalogo:
+            self.cache_catalogo['itens'] = [
+                (produto_id, produto, self.reservas.disponivel(produto))
+                for produto_id, produto in sorted(self.produtos.items(), key=lambda item: int(item[0]))
+            ]
+        return self.cache_catalogo['itens']
+
+    def total_paginas(self, tamanho):
+        return max(1, -(-len(self.catalogo()) // tamanho))
+
+    def opcoes_menu(self, pagina):
+        """Opções (valor, rótulo, descrição) de uma página do menu de compra"""
+        chave = ('menu', pagina)
+        if chave not in self.cache_catalogo:
+            inicio = pagina * PRODUTOS_POR_MENU
+            self.cache_catalogo[chave] = [
+                (produto_id, f"{produto['nome']} - {formatar_reais(produto['preco_centavos'])}"[:100], f"Estoque: {disponivel}")
+                for produto_id, produto, disponivel in self.catalogo()[inicio:inicio + PRODUTOS_POR_MENU]
+            ]
+        return self.cache_catalogo[chave]
+
+    def embed_loja(self, pagina):
+        """Embed de uma página do comando loja"""
+        chave = ('loja', pagina)
+        if chave not in self.cache_catalogo:
+            embed = discord.Embed(
+                title="🛍️ Loja",
+                description="Selecione um produto para comprar",
+                color=discord.Color.blue()
+            )
+
+            inicio = pagina * PRODUTOS_POR_PAGINA
+            for produto_id, produto, disponivel in self.catalogo()[inicio:inicio + PRODUTOS_POR_PAGINA]:
+                embed.add_field(
+                    name=f"{produto['nome']} - {formatar_reais(produto['preco_centavos'])}",
+                    value=f"{produto['descricao']}\nEstoque: {disponivel}\nID: {produto_id}",
+                    inline=False
+                )
+            embed.set_footer(text=f"Página {pagina + 1} de {self.total_paginas(PRODUTOS_POR_PAGINA)}")
+            self.cache_catalogo[chave] = embed
+        return self.cache_catalogo[chave]
+
+    def catalogo_alterado(self):
+        """Invalida o cache do catálogo e agenda a atualização dos menus publicados"""
+        self.versao_catalogo += 1
+        self.cache_catalogo = {}
+        if self.menus and (self.tarefa_menus is None or self.tarefa_menus.done()):
+            self.tarefa_menus = self.bot.loop.create_task(self.atualizar_menus())
+
+    async def registrar_menu(self, mensagem, pagina):
+        """Guarda o menu publicado para atualizá-lo e religá-lo depois de um reinício"""
+        self.menus[mensagem.id] = {'canal': mensagem.channel.id, 'pagina': pagina}
+        try:
+            await self.persistencia.executar(self.loja.salvar_menu, mensagem.id, mensagem.channel.id, pagina)
+        except Exception as e:
+            print(f"Erro ao salvar menu {mensagem.id}: {str(e)}")
+
+    async def remover_menu(self, message_id):
+        self.menus.pop(message_id, None)
+        try:
+            await self.persistencia.executar(self.loja.remover_menu, message_id)
+        except Exception as e:
+            print(f"Erro ao remover menu {message_id}: {str(e)}")
+
+    async def atualizar_menus(self):
+        """Edita os menus publicados uma vez por rajada de alterações do catálogo"""
+        await asyncio.sleep(ESPERA_ATUALIZACAO_MENUS)
+        versao = self.versao_catalogo
+        await asyncio.gather(*(self.editar_menu(message_id, menu) for message_id, menu in list(self.menus.items())))
+        # Alterações feitas durante as edições entram em uma nova rodada
+        if self.versao_catalogo != versao:
+            self.tarefa_menus = self.bot.loop.create_task(self.atualizar_menus())
+
+    async def editar_menu(self, message_id, menu):
+        channel = self.bot.get_channel(menu['canal'])
+        try:
+            if channel is None:
+                # Fora do cache não quer dizer apagado (servidor indisponível, por exemplo):
+                # só um 404 tira o menu do registro
+                channel = await self.bot.fetch_channel(menu['canal'])
+            async with self.semaforo_edicoes:
+                await channel.get_partial_message(message_id).edit(view=ProdutoView(self, menu['pagina']))
+        except discord.NotFound:
+            # O canal ou a mensagem foram apagados: o menu sai do registro
+            await self.remover_menu(message_id)
+        except Exception as e:
+            print(f"Erro ao atualizar menu {message_id}: {str(e)}")
+
+    async def registrar_transacao(self, transacao):
         """Registra uma transação no diretório de dados"""
-        data = datetime.now().strftime("%Y-%m-%d")
-        arquivo = self.transacoes_dir / f"{data}.json"
-        
         try:
-            # Carregar transações existentes do dia
-            if arquivo.exists():
-                with open(arquivo, 'r', encoding='utf-8') as f:
-                    transacoes = json.load(f)
-            else:
-                transacoes = []
-            
-            # Adicionar nova transação
-            transacoes.append(transacao)
-            
-            # Salvar transações atualizadas
-            with open(arquivo, 'w', encoding='utf-8') as f:
-                json.dump(transacoes, f, ensure_ascii=False, indent=4)
+            await self.escritor_transacoes.enfileirar(transacao)
         except Exception as e:
             print(f"Erro ao registrar transação: {str(e)}")
 
+    def gravar_transacoes(self, lote):
+        """Acrescenta um lote de transações ao arquivo do dia e atualiza os agregados"""
+        data = datetime.now().strftime("%Y-%m-%d")
+        arquivo = self.transacoes_dir / f"{data}.ndjson"
+
+        # Uma linha por transação, só acrescentada; um fsync por lote
+        with open(arquivo, 'a', encoding='utf-8') as f:
+            f.write("".join(json.dumps(transacao, ensure_ascii=False) + "\n" for transacao in lote))
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.agregados.registrar(data, lote)
+
+    def migrar_transacoes(self):
+        """Converte os arquivos diários antigos (array JSON) para NDJSON"""
+        for arquivo in sorted(self.transacoes_dir.glob("*.json")):
+            try:
+                with open(arquivo, 'r', encoding='utf-8') as f:
+                    transacoes = json.load(f)
+                destino = arquivo.with_suffix(".ndjson")
+                temporario = arquivo.with_suffix(".ndjson.tmp")
+                with open(temporario, 'w', encoding='utf-8') as f:
+                    f.write("".join(json.dumps(transacao, ensure_ascii=False) + "\n" for transacao in transacoes))
+                    # Linhas já gravadas no novo formato vêm depois das antigas
+                    if destino.exists():
+                        with open(destino, 'r', encoding='utf-8') as existente:
+                            f.write(existente.read())
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temporario, destino)
+                arquivo.unlink()
+                print(f"Transações de {arquivo.name} migradas para {destino.name}")
+            except Exception as e:
+                print(f"Erro ao migrar transações de {arquivo}: {str(e)}")
+
+    def ler_arquivo_transacoes(self, arquivo):
+        """Percorre as transações de um arquivo diário, linha a linha"""
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            for linha in f:
+                # Uma linha sem quebra no fim (ou inválida) foi interrompida no meio da escrita
+                if not linha.endswith("\n"):
+                    break
+                try:
+                    transacao = json.loads(linha)
+                except ValueError:
+                    continue
+                # Transações antigas guardavam o valor em reais (float)
+                if 'valor' in transacao:
+                    transacao['valor_centavos'] = para_centavos(transacao.pop('valor'))
+                yield transacao
+
+    def ler_transacoes(self, data_fim, dias):
+        """Percorre as transações dos últimos `dias` dias, sem carregar tudo na memória"""
+        for i in range(dias):
+            data = data_fim - timedelta(days=i)
+            arquivo = self.transacoes_dir / f"{data.strftime('%Y-%m-%d')}.ndjson"
+            if arquivo.exists():
+                yield from self.ler_arquivo_transacoes(arquivo)
+
+    def ler_dias_gravados(self):
+        """Gera (data, transações) de todos os arquivos diários, para reconstruir os agregados"""
+        for arquivo in sorted(self.transacoes_dir.glob("*.ndjson")):
+            yield arquivo.stem, self.ler_arquivo_transacoes(arquivo)
+
     @commands.has_permissions(administrator=True)
     @commands.command()
     async def postar_produto(self, ctx: commands.Context):
         """Inicia o processo de adicionar um novo produto"""
-        form = ProdutoForm()
-        form.cog = self
-        await ctx.send("Clique no botão abaixo para adicionar um novo produto:", view=ProdutoFormView(form))
+        await ctx.send("Clique no botão abaixo para adicionar um novo produto:", view=ProdutoFormView(self))
 
     @commands.has_permissions(administrator=True)
     @commands.command()
@@ -281,68 +619,71 @@ class Pagamento(commands.Cog):
         """Remove um produto da loja"""
         if produto_id in self.produtos:
             nome = self.produtos[produto_id]["nome"]
-            arquivo = self.produtos_dir / f"{produto_id}.json"
-            if arquivo.exists():
-                arquivo.unlink()
             del self.produtos[produto_id]
+            self.catalogo_alterado()
+            await self.salvar_produto(produto_id, None)
             await ctx.reply(f"✅ Produto '{nome}' removido com sucesso!")
         else:
             await ctx.reply("❌ Produto não encontrado!")
 
     @commands.has_permissions(administrator=True)
     @commands.command()
-    async def atualizar_produto(self, ctx: commands.Context, produto_id: str, preco: float = None, estoque: int = None, *, descricao: str = None):
+    async def atualizar_produto(self, ctx: commands.Context, produto_id: str, preco: para_centavos = None, estoque: int = None, *, descricao: str = None):
         """Atualiza informações de um produto"""
         if produto_id not in self.produtos:
             await ctx.reply("❌ Produto não encontrado!")
             return
 
         if preco is not None:
-            self.produtos[produto_id]["preco"] = preco
+            self.produtos[produto_id]["preco_centavos"] = preco
         if estoque is not None:
             self.produtos[produto_id]["estoque"] = estoque
         if descricao is not None:
             self.produtos[produto_id]["descricao"] = descricao
 
-        self.salvar_produto(produto_id, self.produtos[produto_id])
+        self.catalogo_alterado()
+        await self.salvar_produto(produto_id, self.produtos[produto_id])
         await ctx.reply("✅ Produto atualizado com sucesso!")
 
     @commands.has_permissions(administrator=True)
     @commands.command()
-    async def desempenho(self, ctx: commands.Context):
-        """Mostra o desempenho das vendas nos últimos 30 dias"""
-        data_fim = datetime.now()
-        data_inicio = data_fim - timedelta(days=30)
-        
-        # Coletar todas as transações do período
-        transacoes = []
-        for i in range(30):
-            data = data_fim - timedelta(days=i)
-            arquivo = self.transacoes_dir / f"{data.strftime('%Y-%m-%d')}.json"
-            if arquivo.exists():
-                with open(arquivo, 'r', encoding='utf-8') as f:
-                    transacoes.extend(json.load(f))
+    async def desempenho(self, ctx: commands.Context, dias: int = 30, motor: str = "nativo"):
+        """Mostra o desempenho das vendas nos últimos dias (motor: nativo ou pandas)"""
+        if not 1 <= dias <= 365:
+            await ctx.reply("❌ O período deve ser entre 1 e 365 dias!")
+            return
 
-        if not transacoes:
-            await ctx.reply("❌ Nenhuma transação encontrada nos últimos 30 dias!")
+        if motor == "pandas":
+            # Relatório pesado sobre as transações brutas, fora do event loop
+            try:
+                # O gerador só lê os arquivos quando consumido, já na thread do executor
+                total_vendas, total_receita, produtos = await self.persistencia.executar(
+                    resumo_pandas, self.ler_transacoes(datetime.now(), dias)
+                )
+            except ImportError:
+                await ctx.reply("❌ O pandas não está instalado; use o motor nativo.")
+                return
+        elif motor == "nativo":
+            # Somar os agregados diários do período
+            total_vendas, total_receita, produtos = self.agregados.resumo(datetime.now(), dias)
+        else:
+            await ctx.reply("❌ Motor inválido! Use `nativo` ou `pandas`.")
+            return
+
+        if not total_vendas:
+            await ctx.reply(f"❌ Nenhuma transação encontrada nos últimos {dias} dias!")
             return
 
-        # Criar DataFrame com as transações
-        df = pd.DataFrame(transacoes)
-        df['data'] = pd.to_datetime(df['timestamp'])
-        
         # Calcular métricas
-        total_vendas = len(df)
-        total_receita = df['valor'].sum()
-        media_diaria = total_vendas / 30
-        media_receita_diaria = total_receita / 30
+        media_diaria = total_vendas / dias
+        media_receita_diaria = total_receita // dias
         
         # Produtos mais vendidos
-        produtos_mais_vendidos = df.groupby('produto_nome').size().sort_values(ascending=False).head(5)
+        produtos_mais_vendidos = produtos.most_common(5)
         
         # Criar embed com as informações
         embed = discord.Embed(
-            title="📊 Desempenho dos Últimos 30 Dias",
+            title=f"📊 Desempenho dos Últimos {dias} Dias",
             color=discord.Color.blue(),
             timestamp=datetime.now()
         )
@@ -354,7 +695,7 @@ class Pagamento(commands.Cog):
         )
         embed.add_field(
             name="Total de Receita",
-            value=f"R$ {total_receita:.2f}",
+            value=formatar_reais(total_receita),
             inline=True
         )
         embed.add_field(
@@ -364,13 +705,13 @@ class Pagamento(commands.Cog):
         )
         embed.add_field(
             name="Média Diária de Receita",
-            value=f"R$ {media_receita_diaria:.2f}/dia",
+            value=f"{formatar_reais(media_receita_diaria)}/dia",
             inline=True
         )
         
         # Adicionar produtos mais vendidos
         produtos_texto = ""
-        for produto, quantidade in produtos_mais_vendidos.items():
+        for produto, quantidade in produtos_mais_vendidos:
             produtos_texto += f"• {produto}: {quantidade} vendas\n"
         embed.add_field(
             name="Top 5 Produtos Mais Vendidos",
@@ -382,15 +723,12 @@ class Pagamento(commands.Cog):
 
     async def gerar_pix(self, title, price, payer_name):
         """Gera um pagamento PIX"""
-        headers = {
-            "Authorization": f"Bearer {self.mercadopago_access_token}",
-            "Content-Type": "application/json"
-        }
-
+        expira_em = datetime.now().astimezone() + VALIDADE_PIX
         payment_data = {
-            "transaction_amount": float(price),
+            "transaction_amount": float(para_reais(price)),
             "description": title,
             "payment_method_id": "pix",
+            "date_of_expiration": expira_em.isoformat(timespec="milliseconds"),
             "payer": {
                 "email": f"{payer_name}@discord.com",
                 "first_name": payer_name,
@@ -403,104 +741,288 @@ class Pagamento(commands.Cog):
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.mercadopago_api_url}/payments",
-                    headers=headers,
-                    json=payment_data
-                ) as response:
-                    if response.status == 201:
-                        data = await response.json()
-                        return {
-                            'id': data['id'],
-                            'qr_code': data['qr_code'],
-                            'pix_code': data['qr_code_base64']
-                        }
+            # A chave de idempotência evita cobrança duplicada quando a criação é repetida
+            status, data = await self.cliente.requisitar(
+                "POST",
+                "/payments",
+                headers={"X-Idempotency-Key": str(uuid.uuid4())},
+                json=payment_data
+            )
+            if status == 201:
+                return {
+                    'id': data['id'],
+                    'qr_code': data['qr_code'],
+                    'pix_code': data['qr_code_base64'],
+                    'expira_em': self.data_expiracao(data.get('date_of_expiration'), expira_em)
+                }
         except Exception as e:
             print(f"Erro ao gerar PIX: {str(e)}")
         return None
 
-    async def verificar_pagamentos(self):
-        """Verifica pagamentos pendentes a cada 30 segundos"""
-        await self.bot.wait_until_ready()
-        while not self.bot.is_closed():
-            headers = {
-                "Authorization": f"Bearer {self.mercadopago_access_token}"
-            }
+    def intervalo_verificacao(self, info):
+        """Intervalo até a próxima consulta: pagamentos novos são consultados com mais frequência"""
+        idade = (datetime.now() - info['timestamp']).total_seconds()
+        minimo = INTERVALO_RECONCILIACAO if self.webhook else 0
+        for idade_max, intervalo in INTERVALOS_VERIFICACAO:
+            if idade < idade_max:
+                return max(intervalo, minimo)
+        return max(INTERVALOS_VERIFICACAO[-1][1], minimo)
+
+    @staticmethod
+    def data_expiracao(texto, padrao):
+        """Converte a data de expiração do Mercado Pago para o horário local, sem fuso"""
+        try:
+            data = datetime.fromisoformat(texto) if texto else padrao
+        except ValueError:
+            data = padrao
+        return data.astimezone().replace(tzinfo=None) if data.tzinfo else data
+
+    async def registrar_pendente(self, payment_id, info):
+        """Guarda um pagamento em andamento na memória e no loja.db"""
+        payment_id = str(payment_id)
+        self.pagamentos_pendentes[payment_id] = info
+        heapq.heappush(self.expiracoes, (info['expira_em'], payment_id))
+        try:
+            await self.persistencia.executar(self.loja.registrar_pendente, payment_id, info)
+        except Exception as e:
+            print(f"Erro ao salvar pagamento pendente {payment_id}: {str(e)}")
+
+    async def expirar_pagamentos(self):
+        """Remove os pagamentos cujo PIX venceu, em O(vencidos)"""
+        agora = datetime.now()
+        vencidos = []
+        while self.expiracoes and self.expiracoes[0][0] <= agora:
+            _, payment_id = heapq.heappop(self.expiracoes)
+            # Entradas de pagamentos já aprovados ficam no heap e são descartadas aqui
+            if payment_id in self.pagamentos_pendentes:
+                vencidos.append(payment_id)
+
+        # O comprador pode ter pago no último minuto, ou a notificação do webhook pode ter
+        # se perdido: cada vencido é consultado uma última vez antes de ser cancelado
+        finais = await asyncio.gather(*(self.consulta_final(payment_id, agora) for payment_id in vencidos))
+        expirados = [(payment_id, info) for payment_id, info in zip(vencidos, finais) if info is not None]
+
+        # Reservas de pagamentos vencidos voltam ao estoque, assim como as que ficaram órfãs;
+        # expirar() já descarta as órfãs, então o catálogo é invalidado aqui
+        orfas = self.reservas.expirar(agora)
+        if orfas:
+            self.catalogo_alterado()
+        await self.liberar_reservas([info.get('reserva') for _, info in expirados] + orfas)
+        if not expirados:
+            return
+
+        try:
+            await self.persistencia.executar(self.loja.atualizar_status, [payment_id for payment_id, _ in expirados], 'expirado')
+        except Exception as e:
+            print(f"Erro ao expirar pagamentos: {str(e)}")
 
-            for payment_id, info in list(self.pagamentos_pendentes.items()):
+        for payment_id, info in expirados:
+            channel = self.bot.get_channel(info['canal'])
+            if channel:
                 try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(
-                            f"{self.mercadopago_api_url}/payments/{payment_id}",
-                            headers=headers
-                        ) as response:
-                            if response.status == 200:
-                                payment_info = await response.json()
-                                
-                                if payment_info['status'] == 'approved':
-                                    # Atualizar estoque
-                                    produto_id = info['produto_id']
-                                    self.produtos[produto_id]["estoque"] -= 1
-                                    self.salvar_produto(produto_id, self.produtos[produto_id])
-                                    
-                                    # Registrar transação
-                                    transacao = {
-                                        'id': payment_id,
-                                        'produto_id': produto_id,
-                                        'produto_nome': self.produtos[produto_id]['nome'],
-                                        'valor': info['valor'],
-                                        'usuario_id': info['usuario'],
-                                        'timestamp': info['timestamp'].isoformat()
-                                    }
-                                    self.registrar_transacao(transacao)
-                                    
-                                    # Notificar usuário e fechar canal
-                                    channel = self.bot.get_channel(info['canal'])
-                                    if channel:
-                                        embed = discord.Embed(
-                                            title="✅ Pagamento Aprovado!",
-                                            description=f"Seu pagamento para {self.produtos[produto_id]['nome']} foi aprovado!",
-                                            color=discord.Color.green()
-                                        )
-                                        await channel.send(embed=embed)
-                                        await asyncio.sleep(5)
-                                        await channel.delete()
-                                    
-                                    # Remover pagamento pendente
-                                    del self.pagamentos_pendentes[payment_id]
-                                    
+                    await channel.send("⌛ O PIX expirou e a compra foi cancelada.")
                 except Exception as e:
-                    print(f"Erro ao verificar pagamento {payment_id}: {str(e)}")
+                    print(f"Erro ao avisar expiração do pagamento {payment_id}: {str(e)}")
+                self.agendar_fechamento(channel)
 
-            await asyncio.sleep(30)  # Verificar a cada 30 segundos
+    async def consulta_final(self, payment_id, agora):
+        """Consulta um pagamento vencido; retira e retorna a info se ele deve expirar, senão None"""
+        try:
+            status = await self.consultar_status(payment_id)
+        except CircuitoAberto:
+            status = None
+        except Exception as e:
+            print(f"Erro ao verificar pagamento {payment_id}: {str(e)}")
+            status = None
 
-    @commands.command()
-    async def loja(self, ctx: commands.Context):
-        """Mostra a loja com produtos disponíveis"""
-        embed = discord.Embed(
-            title="🛍️ Loja",
-            description="Selecione um produto para comprar",
-            color=discord.Color.blue()
-        )
+        if status == 'approved':
+            await self.aprovar_pagamento(payment_id)
+            return None
+        info = self.pagamentos_pendentes.get(payment_id)
+        if info is None:
+            # Aprovado ou cancelado enquanto a consulta estava em andamento
+            return None
+        if status is None and agora < info['expira_em'] + TOLERANCIA_EXPIRACAO:
+            # Sem resposta da API: consulta de novo em breve em vez de cancelar às cegas
+            heapq.heappush(self.expiracoes, (agora + timedelta(seconds=INTERVALO_CONSULTA_FINAL), payment_id))
+            return None
+        return self.pagamentos_pendentes.pop(payment_id)
 
-        for produto_id, produto in self.produtos.items():
-            embed.add_field(
-                name=f"{produto['nome']} - R$ {produto['preco']:.2f}",
-                value=f"{produto['descricao']}\nEstoque: {produto['estoque']}\nID: {produto_id}",
-                inline=False
+    async def reservar_estoque(self, produto_id, usuario):
+        """Reserva uma unidade do produto até o PIX vencer; retorna o ID da reserva ou None"""
+        produto = self.produtos.get(produto_id)
+        if produto is None:
+            return None
+        expira_em = datetime.now() + VALIDADE_PIX + MARGEM_RESERVA
+        reserva_id = self.reservas.reservar(produto, usuario, expira_em)
+        if reserva_id is None:
+            return None
+        self.catalogo_alterado()
+        try:
+            await self.persistencia.executar(self.loja.registrar_reserva, reserva_id, produto_id, usuario, expira_em)
+        except Exception as e:
+            print(f"Erro ao salvar reserva {reserva_id}: {str(e)}")
+        return reserva_id
+
+    async def liberar_reservas(self, reserva_ids):
+        """Descarta reservas (as já resolvidas são ignoradas) e as remove do loja.db"""
+        liberadas = [reserva_id for reserva_id in reserva_ids if self.reservas.liberar(reserva_id) is not None]
+        if liberadas:
+            self.catalogo_alterado()
+        reserva_ids = [reserva_id for reserva_id in reserva_ids if reserva_id]
+        if not reserva_ids:
+            return
+        try:
+            await self.persistencia.executar(self.loja.remover_reservas, reserva_ids)
+        except Exception as e:
+            print(f"Erro ao remover reservas: {str(e)}")
+
+    async def cancelar_pagamento(self, payment_id):
+        """Cancela um pagamento pendente e devolve a unidade reservada"""
+        info = self.pagamentos_pendentes.pop(payment_id, None)
+        if info is None:
+            return
+        await self.liberar_reservas([info.get('reserva')])
+        try:
+            await self.persistencia.executar(self.loja.atualizar_status, [payment_id], 'cancelado')
+        except Exception as e:
+            print(f"Erro ao cancelar pagamento {payment_id}: {str(e)}")
+
+    def agendar_fechamento(self, channel):
+        tarefa = self.bot.loop.create_task(self.fechar_canal(channel))
+        self.tarefas_canais.add(tarefa)
+        tarefa.add_done_callback(self.tarefas_canais.discard)
+
+    async def notificacao_pagamento(self, payment_id):
+        """Trata uma notificação do webhook conferindo o status na API, como a consulta periódica
+
+        Retorna False se a API não respondeu, para o webhook aceitar a repetição da entrega.
+        """
+        info = self.pagamentos_pendentes.get(payment_id)
+        if info is None:
+            return True
+        return await self.verificar_pagamento(payment_id, info)
+
+    async def verificar_pagamentos(self):
+        """Consulta em paralelo os pagamentos pendentes cuja próxima verificação já venceu"""
+        await self.bot.wait_until_ready()
+        while not self.bot.is_closed() and not self.encerrado:
+            await self.expirar_pagamentos()
+            agora = datetime.now()
+            vencidos = [
+                (payment_id, info) for payment_id, info in list(self.pagamentos_pendentes.items())
+                if info.get('proxima_verificacao', agora) <= agora
+            ]
+            if vencidos:
+                await asyncio.gather(*(self.verificar_pagamento(payment_id, info) for payment_id, info in vencidos))
+
+            await asyncio.sleep(INTERVALO_CICLO)
+
+    async def consultar_status(self, payment_id):
+        """Status do pagamento na API ('approved', 'pending'...), ou None se a resposta não veio"""
+        async with self.semaforo_consultas:
+            status, payment_info = await self.cliente.requisitar("GET", f"/payments/{payment_id}")
+        return payment_info['status'] if status == 200 else None
+
+    async def verificar_pagamento(self, payment_id, info):
+        """Consulta o status de um pagamento, limitado pelo semáforo de consultas
+
+        Retorna True se a consulta foi concluída e False se a API não respondeu.
+        """
+        try:
+            status = await self.consultar_status(payment_id)
+            if status == 'approved':
+                await self.aprovar_pagamento(payment_id)
+            return status is not None
+        except CircuitoAberto:
+            # A API está fora; o pagamento é consultado de novo no próximo intervalo
+            return False
+        except Exception as e:
+            print(f"Erro ao verificar pagamento {payment_id}: {str(e)}")
+            return False
+        finally:
+            info['proxima_verificacao'] = datetime.now() + timedelta(seconds=self.intervalo_verificacao(info))
+
+    async def aprovar_pagamento(self, payment_id):
+        """Baixa o estoque, registra a venda e avisa o comprador de um pagamento aprovado"""
+        # Retirar antes de qualquer await impede que o mesmo pagamento seja aprovado duas vezes
+        info = self.pagamentos_pendentes.pop(payment_id, None)
+        if info is None:
+            return
+        try:
+            await self.persistencia.executar(self.loja.atualizar_status, [payment_id], 'aprovado')
+        except Exception as e:
+            print(f"Erro ao atualizar pagamento {payment_id}: {str(e)}")
+
+        # A unidade reservada vira baixa definitiva no estoque, se o produto ainda existir
+        produto_id = info['produto_id']
+        produto = self.produtos.get(produto_id)
+        if produto is not None:
+            produto["estoque"] -= 1
+            self.catalogo_alterado()
+        # Sem await entre a baixa e a liberação, o disponível nunca conta a unidade duas vezes
+        await self.liberar_reservas([info.get('reserva')])
+        if produto is not None:
+            await self.salvar_produto(produto_id, produto)
+
+        # Nome e valor vêm do próprio pagamento: o produto pode ter sido removido com o PIX em aberto
+        nome = info.get('produto_nome') or (produto['nome'] if produto else f"Produto {produto_id}")
+
+        # Registrar transação
+        transacao = {
+            'id': payment_id,
+            'produto_id': produto_id,
+            'produto_nome': nome,
+            'valor_centavos': info['valor_centavos'],
+            'usuario_id': info['usuario'],
+            'timestamp': info['timestamp'].isoformat()
+        }
+        await self.registrar_transacao(transacao)
+
+        # Notificar usuário e fechar o canal sem segurar o verificador
+        channel = self.bot.get_channel(info['canal'])
+        if channel:
+            embed = discord.Embed(
+                title="✅ Pagamento Aprovado!",
+                description=f"Seu pagamento para {nome} foi aprovado!",
+                color=discord.Color.green()
             )
+            await channel.send(embed=embed)
+            self.agendar_fechamento(channel)
 
-        await ctx.reply(embed=embed)
+    async def fechar_canal(self, channel, espera=5):
+        """Apaga o canal de compra depois de alguns segundos"""
+        try:
+            await asyncio.sleep(espera)
+            await channel.delete()
+        except Exception as e:
+            print(f"Erro ao apagar canal {channel.id}: {str(e)}")
+
+    @commands.command()
+    async def loja(self, ctx: commands.Context, pagina: int = 1):
+        """Mostra a loja com produtos disponíveis, 10 por página"""
+        view = LojaView(self, max(pagina, 1) - 1)
+        await ctx.reply(embed=self.embed_loja(view.pagina), view=view)
 
 class ProdutoFormView(discord.ui.View):
-    def __init__(self, form):
+    def __init__(self, cog):
         super().__init__(timeout=None)
-        self.form = form
+        self.cog = cog
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        # O botão é persistente e fica em mensagens antigas: a mesma permissão do postar_produto
+        permissoes = getattr(interaction.user, "guild_permissions", None)
+        if permissoes is None or not permissoes.administrator:
+            await interaction.response.send_message("❌ Apenas administradores podem adicionar produtos!", ephemeral=True)
+            return False
+        return True
 
-    @discord.ui.button(label="Adicionar Produto", style=discord.ButtonStyle.green)
+    @discord.ui.button(label="Adicionar Produto", style=discord.ButtonStyle.green, custom_id="loja:formulario:adicionar")
     async def adicionar_produto(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_modal(self.form)
+        # Um formulário novo a cada clique, já que o botão fica ativo para sempre
+        form = ProdutoForm()
+        form.cog = self.cog
+        await interaction.response.send_modal(form)
 
 async def setup(bot):
     await bot.add_cog(Pagamento(bot))
@@ -1,6 +1,9 @@
 import discord
 from discord.ext import commands
 
+# Só usa mensagens, já cobertas pelos intents básicos do main.py
+INTENTS = []
+
 class Utilidade(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -1,6 +1,9 @@
 import discord
 from discord.ext import commands
 
+# Intents usados no modo enxuto: on_member_join e o ticket por reação
+INTENTS = ["members", "guild_reactions"]
+
 class Eventos(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
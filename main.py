@@ -2,27 +2,41 @@ import discord
 from discord.ext import commands
 import os
 import asyncio
+import time
 from dotenv import load_dotenv
+from nucleo.carregador import carregar_extensoes, intents_necessarios
+from nucleo.inicializacao import registrar_inicializacao
+from nucleo.persistencia import obter_persistencia
+from nucleo.recarga import recarregando
+
+INICIO = time.perf_counter()
 
 # Carrega as variáveis de ambiente
 load_dotenv()
 
+# Modo enxuto (BOT_MODO_ENXUTO=1): só os intents declarados pelas extensões em INTENTS,
+# sem cache de membros e sem baixar a lista de membros de cada servidor ao iniciar
+MODO_ENXUTO = os.getenv("BOT_MODO_ENXUTO") == "1"
+
 # Configuração do bot
-intents = discord.Intents.all()
-bot = commands.Bot(command_prefix="b!", intents=intents)
+if MODO_ENXUTO:
+    intents = discord.Intents.none()
+    for nome in intents_necessarios(("eventos", "comandos")):
+        setattr(intents, nome, True)
+    bot = commands.Bot(
+        command_prefix="b!",
+        intents=intents,
+        member_cache_flags=discord.MemberCacheFlags.none(),
+        chunk_guilds_at_startup=False
+    )
+else:
+    intents = discord.Intents.all()
+    bot = commands.Bot(command_prefix="b!", intents=intents)
 
-# Carrega os cogs
+# Carrega os cogs em paralelo; cada extensão pode declarar DEPENDENCIAS = ["comandos.outra"]
 async def load_extensions():
     try:
-        for filename in os.listdir("./eventos"):
-            if filename.endswith(".py") and not filename.startswith("_"):
-                await bot.load_extension(f"eventos.{filename[:-3]}")
-                print(f"Carregado: eventos.{filename[:-3]}")
-        
-        for filename in os.listdir("./comandos"):
-            if filename.endswith(".py") and not filename.startswith("_"):
-                await bot.load_extension(f"comandos.{filename[:-3]}")
-                print(f"Carregado: comandos.{filename[:-3]}")
+        await carregar_extensoes(bot, ("eventos", "comandos"))
     except Exception as e:
         print(f"Erro ao carregar extensões: {e}")
 
@@ -30,6 +44,20 @@ async def load_extensions():
 async def on_ready():
     print(f'Bot está online como {bot.user.name}')
     print('------')
+    # on_ready roda de novo a cada reconexão; só a primeira conta como inicialização
+    if not getattr(bot, "inicializacao_registrada", False):
+        bot.inicializacao_registrada = True
+        try:
+            relatorio = await obter_persistencia().executar(
+                registrar_inicializacao,
+                "enxuto" if MODO_ENXUTO else "completo",
+                time.perf_counter() - INICIO,
+                len(bot.guilds),
+                sum(len(guild.members) for guild in bot.guilds)
+            )
+            print(relatorio)
+        except Exception as e:
+            print(f"Erro ao registrar inicialização: {str(e)}")
 
 async def setup_default_role(guild):
     try:
@@ -81,6 +109,20 @@ async def avatar(ctx, member: discord.Member = None):
     embed.set_image(url=member.avatar.url + "?size=1024")
     await ctx.send(embed=embed)
 
+@bot.command()
+@commands.is_owner()
+async def recarregar(ctx, extensao: str):
+    """Recarrega uma extensão sem reiniciar o bot, mantendo o estado em memória dos cogs"""
+    nome = extensao if "." in extensao else f"comandos.{extensao}"
+    inicio = time.perf_counter()
+    try:
+        with recarregando(nome):
+            await bot.reload_extension(nome)
+    except Exception as e:
+        await ctx.send(f"❌ Erro ao recarregar {nome}: {str(e)}")
+        return
+    await ctx.send(f"✅ {nome} recarregada em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
 if __name__ == "__main__":
     try:
         asyncio.run(main())
@@ -0,0 +1,272 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from nucleo.dinheiro import migrar_conta
+from nucleo.historico import IndiceHistorico, descrever
+from nucleo.ledger import Ledger, ler_historico_legado, usuarios_da_transacao
+from nucleo.journal import JournalContas
+
+class ArmazenamentoContas:
+    """Interface comum dos backends de armazenamento do Banco
+
+    Os métodos são bloqueantes e pensados para rodar no executor da camada
+    de persistência; cada backend se sincroniza internamente com `trava`.
+    """
+
+    precisa_compactar = False
+
+    def __init__(self):
+        self.trava = threading.Lock()
+
+    def carregar(self):
+        """Retorna todas as contas como um dicionário {user_id: conta}"""
+        raise NotImplementedError
+
+    def gravar_lote(self, lote):
+        """Persiste um lote de mutações [{"contas": {...}, "transacoes": [(tipo, detalhes)]}]"""
+        raise NotImplementedError
+
+    def historico(self, user_id, limite=5, deslocamento=0):
+        """Retorna transações do usuário como (data, descrição), pulando as `deslocamento` mais novas"""
+        raise NotImplementedError
+
+    def iniciar_compactacao(self):
+        """Primeira fase da compactação; retorna True se ainda falta concluir_compactacao"""
+        return False
+
+    def concluir_compactacao(self):
+        """Grava o snapshot com o que foi persistido até iniciar_compactacao"""
+        pass
+
+    def fechar(self):
+        pass
+
+
+class ArmazenamentoJSON(ArmazenamentoContas):
+    """Backend em arquivos: snapshot JSON + journal e ledger NDJSON segmentado e indexado"""
+
+    def __init__(self, accounts_file='data/accounts.json', ledger_dir='data/ledger', ledger_antigo='data/ledger.ndjson', log_file='data/transactions.log'):
+        super().__init__()
+        self.journal = JournalContas(accounts_file, accounts_file.replace('.json', '.journal'))
+
+        ledger_novo = not os.path.isdir(ledger_dir)
+        # LEDGER_COMPRIMIR=1 comprime com gzip os segmentos já rotacionados
+        self.ledger = Ledger(ledger_dir, comprimir=os.getenv('LEDGER_COMPRIMIR') == '1')
+        if ledger_novo:
+            migradas = self.ledger.migrar(ledger_antigo, log_file)
+            if migradas:
+                print(f"Migradas {migradas} transações para {ledger_dir}")
+        self.indice = IndiceHistorico(self.ledger)
+
+    def carregar(self):
+        with self.trava:
+            saldos = self.journal.carregar()
+            # Contas antigas (saldo em reais) são convertidas e regravadas no journal
+            migradas = {user_id: conta for user_id, conta in saldos.items() if migrar_conta(conta)}
+            if migradas:
+                self.journal.registrar(migradas)
+                print(f"Migradas {len(migradas)} contas para saldos em centavos")
+            return saldos
+
+    def gravar_lote(self, lote):
+        with self.trava:
+            marca = self.journal.marca()
+            self.journal.registrar_lote([item["contas"] for item in lote if item["contas"]])
+            try:
+                self.indice.registrar_lote([transacao for item in lote for transacao in item["transacoes"]])
+            except Exception:
+                # O ledger já desfez a própria escrita; sem desfazer o journal os saldos
+                # voltariam no reinício sem a transação correspondente
+                self.journal.desfazer(marca)
+                raise
+
+    def historico(self, user_id, limite=5, deslocamento=0):
+        with self.trava:
+            return self.indice.historico(user_id, limite, deslocamento)
+
+    @property
+    def precisa_compactar(self):
+        return self.journal.precisa_compactar
+
+    def iniciar_compactacao(self):
+        self.comprimir_segmentos()
+        # Só a rotação do journal bloqueia as escritas; o snapshot é gravado depois
+        with self.trava:
+            if self.journal.entradas == 0:
+                return False
+            self.journal.iniciar_compactacao()
+            self._salvar_indice = self.indice.preparar_salvamento()
+        return True
+
+    def concluir_compactacao(self):
+        self.journal.gravar_snapshot()
+        self._salvar_indice()
+
+    def comprimir_segmentos(self):
+        """Comprime os segmentos fechados; só a troca de arquivos bloqueia as leituras"""
+        with self.trava:
+            pendentes = self.ledger.pendentes_de_compressao()
+        for segmento in pendentes:
+            try:
+                self.ledger.comprimir_segmento(segmento)
+                with self.trava:
+                    self.ledger.trocar_por_comprimido(segmento)
+            except OSError as e:
+                print(f"Erro ao comprimir segmento {segmento.numero}: {str(e)}")
+
+    def fechar(self):
+        with self.trava:
+            self.journal.fechar()
+            self.indice.fechar()
+            self.ledger.fechar()
+
+
+class ArmazenamentoSQLite(ArmazenamentoContas):
+    """Backend SQLite em modo WAL com tabelas indexadas de contas e transações"""
+
+    # 1: schema inicial; 2: saldos em centavos inteiros
+    VERSAO_SCHEMA = 2
+
+    def __init__(self, db_file='data/banco.db', accounts_file='data/accounts.json', ledger_dir='data/ledger', ledger_antigo='data/ledger.ndjson', log_file='data/transactions.log'):
+        super().__init__()
+        # A conexão é usada pelas threads do executor, sempre sob a trava
+        self.conexao = sqlite3.connect(db_file, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+
+        versao = self.conexao.execute("PRAGMA user_version").fetchone()[0]
+        if versao < self.VERSAO_SCHEMA:
+            self.conexao.execute("BEGIN")
+            with self.conexao:
+                if versao == 0:
+                    self.criar_schema()
+                    self.migrar_arquivos(accounts_file, ledger_dir, ledger_antigo, log_file)
+                else:
+                    self.migrar_schema(versao)
+                self.conexao.execute(f"PRAGMA user_version = {self.VERSAO_SCHEMA}")
+
+    def criar_schema(self):
+        for comando in (
+            """CREATE TABLE contas (
+                user_id TEXT PRIMARY KEY,
+                saldo_centavos INTEGER NOT NULL,
+                criado_em TEXT NOT NULL,
+                ultima_atividade TEXT NOT NULL
+            ) WITHOUT ROWID""",
+            """CREATE TABLE transacoes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                data TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                detalhes TEXT NOT NULL
+            )""",
+            """CREATE TABLE transacoes_usuarios (
+                user_id TEXT NOT NULL,
+                seq INTEGER NOT NULL REFERENCES transacoes(seq),
+                PRIMARY KEY (user_id, seq)
+            ) WITHOUT ROWID""",
+        ):
+            self.conexao.execute(comando)
+
+    def migrar_schema(self, versao):
+        """Atualiza um banco criado por uma versão anterior do schema"""
+        if versao < 2:
+            # Saldos em reais (NUMERIC) passam a ser centavos inteiros
+            self.conexao.execute("ALTER TABLE contas RENAME COLUMN saldo TO saldo_centavos")
+            self.conexao.execute("UPDATE contas SET saldo_centavos = CAST(ROUND(saldo_centavos * 100) AS INTEGER)")
+            print("Saldos das contas migrados para centavos")
+
+    def migrar_arquivos(self, accounts_file, ledger_dir, ledger_antigo, log_file):
+        """Importa accounts.json (com o journal) e o histórico em arquivos na primeira execução"""
+        if os.path.exists(accounts_file):
+            journal = JournalContas(accounts_file, accounts_file.replace('.json', '.journal'))
+            contas = journal.carregar()
+            journal.fechar()
+            for conta in contas.values():
+                migrar_conta(conta)
+            self._salvar_contas(contas)
+            print(f"Migradas {len(contas)} contas de {accounts_file}")
+
+        migradas = 0
+        if os.path.isdir(ledger_dir):
+            ledger = Ledger(ledger_dir)
+            for registro in ledger.ler_tudo():
+                self._registrar_transacao(registro["data"], registro["tipo"], registro["detalhes"])
+                migradas += 1
+            ledger.fechar()
+        else:
+            for data, tipo, detalhes in ler_historico_legado(ledger_antigo, log_file):
+                self._registrar_transacao(data, tipo, detalhes)
+                migradas += 1
+        if migradas:
+            print(f"Migradas {migradas} transações do histórico em arquivos")
+
+    def carregar(self):
+        with self.trava:
+            cursor = self.conexao.execute("SELECT user_id, saldo_centavos, criado_em, ultima_atividade FROM contas")
+            return {
+                user_id: {"saldo_centavos": saldo, "criado_em": criado_em, "ultima_atividade": ultima_atividade}
+                for user_id, saldo, criado_em, ultima_atividade in cursor
+            }
+
+    def _salvar_contas(self, contas):
+        self.conexao.executemany(
+            """INSERT INTO contas (user_id, saldo_centavos, criado_em, ultima_atividade) VALUES (?, ?, ?, ?)
+               ON CONFLICT(user_id) DO UPDATE SET saldo_centavos = excluded.saldo_centavos, ultima_atividade = excluded.ultima_atividade""",
+            [(user_id, conta["saldo_centavos"], conta["criado_em"], conta["ultima_atividade"]) for user_id, conta in contas.items()]
+        )
+
+    def _registrar_transacao(self, data, tipo, detalhes):
+        cursor = self.conexao.execute(
+            "INSERT INTO transacoes (data, tipo, detalhes) VALUES (?, ?, ?)",
+            (data, tipo, json.dumps(detalhes, default=str, ensure_ascii=False))
+        )
+        self.conexao.executemany(
+            "INSERT OR IGNORE INTO transacoes_usuarios (user_id, seq) VALUES (?, ?)",
+            [(user_id, cursor.lastrowid) for user_id in usuarios_da_transacao(detalhes)]
+        )
+
+    def gravar_lote(self, lote):
+        data = datetime.now().isoformat()
+        # O lote inteiro vira uma única transação do SQLite
+        with self.trava, self.conexao:
+            for item in lote:
+                self._salvar_contas(item["contas"])
+                for tipo, detalhes in item["transacoes"]:
+                    self._registrar_transacao(data, tipo, detalhes)
+
+    def historico(self, user_id, limite=5, deslocamento=0):
+        with self.trava:
+            cursor = self.conexao.execute(
+                """SELECT t.data, t.tipo, t.detalhes FROM transacoes_usuarios u
+                   JOIN transacoes t ON t.seq = u.seq
+                   WHERE u.user_id = ? ORDER BY u.seq DESC LIMIT ? OFFSET ?""",
+                (user_id, limite, deslocamento)
+            )
+            # Mesmo formato do backend JSON; linhas antigas gravadas com escapes \uXXXX também saem legíveis
+            return [
+                descrever({"data": data, "tipo": tipo, "detalhes": json.loads(detalhes)})
+                for data, tipo, detalhes in reversed(cursor.fetchall())
+            ]
+
+    def iniciar_compactacao(self):
+        # Equivalente à compactação: move o WAL para o banco principal
+        with self.trava:
+            self.conexao.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return False
+
+    def fechar(self):
+        with self.trava:
+            self.conexao.close()
+
+
+def criar_armazenamento(tipo=None):
+    """Cria o backend configurado em BANCO_ARMAZENAMENTO (sqlite ou json)"""
+    tipo = (tipo or os.getenv('BANCO_ARMAZENAMENTO', 'sqlite')).lower()
+    if tipo == 'json':
+        return ArmazenamentoJSON()
+    if tipo == 'sqlite':
+        return ArmazenamentoSQLite()
+    raise ValueError(f"Backend de armazenamento desconhecido: {tipo}")
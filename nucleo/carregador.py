@@ -0,0 +1,173 @@
+import ast
+import asyncio
+import importlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def listar_extensoes(pastas=("eventos", "comandos")):
+    """Lista as extensões (pasta.modulo) dos arquivos .py que não começam com "_" """
+    extensoes = {}
+    for pasta in pastas:
+        for filename in sorted(os.listdir(f"./{pasta}")):
+            if filename.endswith(".py") and not filename.startswith("_"):
+                extensoes[f"{pasta}.{filename[:-3]}"] = os.path.join(pasta, filename)
+    return extensoes
+
+
+# Intents que o bot sempre precisa para receber comandos de prefixo
+INTENTS_BASE = ("guilds", "guild_messages", "dm_messages", "message_content")
+
+
+def ler_declaracoes(caminho):
+    """Lê, sem importar o arquivo, os módulos importados e as listas DEPENDENCIAS e INTENTS da extensão"""
+    with open(caminho, 'r', encoding='utf-8') as f:
+        arvore = ast.parse(f.read(), filename=caminho)
+
+    modulos = []
+    dependencias = []
+    intents = []
+    for no in arvore.body:
+        if isinstance(no, ast.Import):
+            modulos.extend(alias.name for alias in no.names)
+        elif isinstance(no, ast.ImportFrom) and no.module and not no.level:
+            modulos.append(no.module)
+        elif isinstance(no, ast.Assign) and any(isinstance(alvo, ast.Name) and alvo.id == "DEPENDENCIAS" for alvo in no.targets):
+            dependencias = list(ast.literal_eval(no.value))
+        elif isinstance(no, ast.Assign) and any(isinstance(alvo, ast.Name) and alvo.id == "INTENTS" for alvo in no.targets):
+            intents = list(ast.literal_eval(no.value))
+    return modulos, dependencias, intents
+
+
+def intents_necessarios(pastas=("eventos", "comandos")):
+    """Une os INTENTS declarados pelas extensões aos intents básicos, sem importar nada"""
+    nomes = set(INTENTS_BASE)
+    for nome, caminho in listar_extensoes(pastas).items():
+        try:
+            nomes.update(ler_declaracoes(caminho)[2])
+        except (SyntaxError, ValueError) as e:
+            print(f"Erro ao ler {nome}: {str(e)}")
+    return sorted(nomes)
+
+
+def importar_modulos(modulos):
+    """Importa os módulos usados por uma extensão"""
+    for modulo in modulos:
+        try:
+            importlib.import_module(modulo)
+        except ImportError:
+            # O erro aparece de novo, com contexto, ao carregar a extensão
+            pass
+
+
+def extensoes_em_ciclo(dependencias):
+    """Extensões que dependem, direta ou indiretamente, delas mesmas"""
+    ciclicas = set()
+    for inicio, deps in dependencias.items():
+        vistas = set()
+        pilha = list(deps)
+        while pilha:
+            atual = pilha.pop()
+            if atual == inicio:
+                ciclicas.add(inicio)
+                break
+            if atual in vistas or atual not in dependencias:
+                continue
+            vistas.add(atual)
+            pilha.extend(dependencias[atual])
+    return ciclicas
+
+
+def ordenar_em_niveis(dependencias):
+    """Agrupa as extensões em níveis: cada uma só depende de extensões de níveis anteriores"""
+    restantes = dict(dependencias)
+    niveis = []
+    while restantes:
+        nivel = [nome for nome, deps in restantes.items() if not any(dep in restantes for dep in deps)]
+        if not nivel:
+            raise ValueError(f"Dependência circular entre extensões: {', '.join(sorted(restantes))}")
+        niveis.append(sorted(nivel))
+        for nome in nivel:
+            del restantes[nome]
+    return niveis
+
+
+async def carregar_extensoes(bot, pastas=("eventos", "comandos")):
+    """Carrega as extensões em paralelo, respeitando DEPENDENCIAS, e imprime o tempo de cada uma
+
+    Os módulos importados pelas extensões são aquecidos em threads antes do
+    carregamento; as extensões de um mesmo nível rodam o setup ao mesmo tempo.
+    A falha de uma extensão não impede as outras, só as que dependem dela;
+    extensões em uma dependência circular contam como falha.
+    """
+    extensoes = listar_extensoes(pastas)
+    declaracoes = {}
+    for nome, caminho in extensoes.items():
+        try:
+            declaracoes[nome] = ler_declaracoes(caminho)
+        except (SyntaxError, ValueError) as e:
+            print(f"Erro ao ler {nome}: {str(e)}")
+
+    # O aquecimento é compartilhado: a primeira thread a importar um módulo paga o custo e as
+    # outras esperam pela trava de importação, então só o tempo total tem significado
+    loop = asyncio.get_running_loop()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(thread_name_prefix="importacao") as executor:
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, importar_modulos, modulos)
+            for modulos, _, _ in declaracoes.values()
+        ))
+    aquecimento = time.perf_counter() - inicio
+    relatorio = {nome: {"carga": None, "status": "ok"} for nome in declaracoes}
+    for nome in extensoes.keys() - declaracoes.keys():
+        relatorio[nome] = {"carga": None, "status": "erro"}
+
+    dependencias = {nome: deps for nome, (_, deps, _) in declaracoes.items()}
+    for nome, deps in dependencias.items():
+        for dep in deps:
+            if dep not in dependencias:
+                print(f"Aviso: {nome} depende de {dep}, que não foi encontrada")
+    dependencias = {nome: [dep for dep in deps if dep in dependencias] for nome, deps in dependencias.items()}
+
+    falhas = set(extensoes.keys() - declaracoes.keys())
+    # Só as extensões do ciclo falham; as que dependem delas são ignoradas e as outras carregam
+    ciclicas = extensoes_em_ciclo(dependencias)
+    if ciclicas:
+        print(f"Erro: dependência circular entre extensões: {', '.join(sorted(ciclicas))}")
+        for nome in ciclicas:
+            relatorio[nome]["status"] = "erro"
+        falhas |= ciclicas
+    niveis = ordenar_em_niveis({nome: deps for nome, deps in dependencias.items() if nome not in ciclicas})
+
+    async def carregar(nome):
+        if any(dep in falhas for dep in dependencias[nome]):
+            relatorio[nome]["status"] = "ignorada"
+            falhas.add(nome)
+            print(f"Ignorado: {nome} (dependência não carregada)")
+            return
+        inicio = time.perf_counter()
+        try:
+            await bot.load_extension(nome)
+            print(f"Carregado: {nome}")
+        except Exception as e:
+            relatorio[nome]["status"] = "erro"
+            falhas.add(nome)
+            print(f"Erro ao carregar extensão {nome}: {e}")
+        relatorio[nome]["carga"] = time.perf_counter() - inicio
+
+    for nivel in niveis:
+        await asyncio.gather(*(carregar(nome) for nome in nivel))
+
+    imprimir_relatorio(relatorio, aquecimento)
+    return relatorio
+
+
+def imprimir_relatorio(relatorio, aquecimento):
+    # carga = importação do próprio módulo da extensão + setup, medidos juntos pelo load_extension
+    print(f"Aquecimento dos imports das extensões (compartilhado): {aquecimento * 1000:.0f} ms")
+    print("Tempo de carregamento das extensões:")
+    print(f"  {'extensão':<28}{'carga':>10}  status")
+    for nome, tempos in sorted(relatorio.items(), key=lambda item: -(item[1]["carga"] or 0)):
+        carga = f"{tempos['carga'] * 1000:.0f} ms" if tempos["carga"] is not None else "-"
+        print(f"  {nome:<28}{carga:>10}  {tempos['status']}")
@@ -0,0 +1,47 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Maior valor aceito em uma operação (R$ 1 bilhão)
+VALOR_MAXIMO_CENTAVOS = 100_000_000_000
+# Maior saldo que cabe em um INTEGER do SQLite (int64)
+SALDO_MAXIMO_CENTAVOS = 2 ** 63 - 1
+
+
+def para_centavos(valor, maximo=VALOR_MAXIMO_CENTAVOS):
+    """Converte um valor em reais ("12,50", "12.5", 12.5) para centavos inteiros, até `maximo` em módulo"""
+    if isinstance(valor, str):
+        valor = valor.strip().replace("R$", "").strip().replace(",", ".")
+    try:
+        decimal = Decimal(str(valor))
+    except InvalidOperation:
+        raise ValueError(f"Valor inválido: {valor}")
+    if not decimal.is_finite():
+        raise ValueError(f"Valor inválido: {valor}")
+    # Compara antes de multiplicar: expoentes enormes estourariam o contexto do Decimal
+    if abs(decimal) > Decimal(maximo) / 100:
+        raise ValueError(f"Valor acima do máximo permitido: {valor}")
+    return int((decimal * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def para_reais(centavos):
+    """Converte centavos para o valor decimal em reais, sem perda de precisão"""
+    return Decimal(centavos) / 100
+
+
+def formatar_reais(centavos):
+    """Formata centavos no padrão usado pelo bot (R$ 1234.56)"""
+    sinal = "-" if centavos < 0 else ""
+    reais, resto = divmod(abs(centavos), 100)
+    return f"R$ {sinal}{reais}.{resto:02d}"
+
+
+def cabe_no_saldo(saldo, valor):
+    """Indica se somar `valor` ao saldo ainda cabe no banco"""
+    return saldo + valor <= SALDO_MAXIMO_CENTAVOS
+
+
+def migrar_conta(conta):
+    """Converte uma conta no formato antigo (saldo em reais) para centavos"""
+    if "saldo" in conta and "saldo_centavos" not in conta:
+        conta["saldo_centavos"] = para_centavos(conta.pop("saldo"), SALDO_MAXIMO_CENTAVOS)
+        return True
+    return False
@@ -0,0 +1,117 @@
+import json
+import os
+from array import array
+from collections import deque
+from functools import partial
+from itertools import islice
+
+from nucleo.ledger import usuarios_da_transacao
+
+
+def descrever(registro):
+    """Converte um registro do ledger em (data, descrição) para o extrato"""
+    return registro["data"], f"{registro['tipo']}: {json.dumps(registro['detalhes'], ensure_ascii=False)}"
+
+
+class IndiceHistorico:
+    """Índice por usuário do histórico guardado no ledger
+
+    O segmento ativo é indexado por offset; os segmentos fechados são
+    localizados pelos seus índices laterais, então uma consulta só abre os
+    segmentos que contêm o usuário.
+    """
+
+    def __init__(self, ledger, recentes=20):
+        self.ledger = ledger
+        self.indice_file = os.path.join(ledger.diretorio, "indice.json")
+        self.max_recentes = recentes
+        # user_id -> offsets dos registros do usuário no segmento ativo
+        self.posicoes = {}
+        # user_id -> últimas entradas já decodificadas, para o extrato em O(1)
+        self.recentes = {}
+        self.segmento = ledger.numero_ativo
+        self.tamanho = 0
+
+        self.carregar()
+
+    def carregar(self):
+        """Carrega o índice salvo e indexa apenas o trecho novo do segmento ativo"""
+        if os.path.exists(self.indice_file):
+            try:
+                with open(self.indice_file, 'r') as f:
+                    salvo = json.load(f)
+                # Um segmento menor que o indexado foi truncado ou substituído
+                if salvo["segmento"] == self.ledger.numero_ativo and salvo["tamanho"] <= self.ledger.tamanho:
+                    self.tamanho = salvo["tamanho"]
+                    self.posicoes = {user_id: array('Q', posicoes) for user_id, posicoes in salvo["usuarios"].items()}
+            except (ValueError, KeyError) as e:
+                print(f"Erro ao carregar índice do histórico, reconstruindo: {str(e)}")
+
+        if self.tamanho < self.ledger.tamanho:
+            for offset, registro in self.ledger.ler_a_partir_de(self.tamanho):
+                self._indexar(offset, registro)
+            self.tamanho = self.ledger.tamanho
+
+    def _indexar(self, offset, registro):
+        for user_id in usuarios_da_transacao(registro["detalhes"]):
+            self.posicoes.setdefault(user_id, array('Q')).append(offset)
+            if user_id in self.recentes:
+                self.recentes[user_id].append(descrever(registro))
+
+    def registrar_lote(self, transacoes):
+        """Acrescenta transações [(tipo, detalhes)] ao ledger e atualiza o índice"""
+        if not transacoes:
+            return
+        escritos = self.ledger.acrescentar(transacoes)
+        if self.ledger.numero_ativo != self.segmento:
+            # O ledger rotacionou: os offsets antigos agora pertencem a um segmento fechado
+            self.segmento = self.ledger.numero_ativo
+            self.posicoes = {}
+        for offset, registro in escritos:
+            self._indexar(offset, registro)
+        self.tamanho = self.ledger.tamanho
+
+    def _mais_novos(self, user_id):
+        """Gera os registros do usuário do mais novo para o mais antigo"""
+        posicoes = self.posicoes.get(user_id, ())
+        for inicio in range(len(posicoes), 0, -self.max_recentes):
+            yield from reversed(self.ledger.ler_varios(posicoes[max(inicio - self.max_recentes, 0):inicio]))
+
+        # Os segmentos fechados são lidos a partir do fim: uma página recente não decodifica o segmento todo
+        for segmento in self.ledger.segmentos_do_usuario(user_id):
+            for registro in segmento.ler_do_fim():
+                if user_id in usuarios_da_transacao(registro["detalhes"]):
+                    yield registro
+
+    def historico(self, user_id, limite=5, deslocamento=0):
+        """Retorna as transações do usuário, das mais antigas para as mais novas"""
+        if user_id not in self.recentes:
+            ultimas = [descrever(registro) for registro in islice(self._mais_novos(user_id), self.max_recentes)]
+            self.recentes[user_id] = deque(reversed(ultimas), maxlen=self.max_recentes)
+        recentes = self.recentes[user_id]
+
+        # As páginas recentes saem da memória; um deque incompleto já tem todo o histórico
+        if deslocamento + limite <= len(recentes) or len(recentes) < self.max_recentes:
+            fim = len(recentes) - deslocamento
+            return list(recentes)[max(fim - limite, 0):max(fim, 0)]
+
+        pagina = [descrever(registro) for registro in islice(self._mais_novos(user_id), deslocamento, deslocamento + limite)]
+        return pagina[::-1]
+
+    def preparar_salvamento(self):
+        """Retorna uma função que grava uma cópia do índice fora do event loop"""
+        copia = {
+            "segmento": self.segmento,
+            "tamanho": self.tamanho,
+            "usuarios": {user_id: posicoes.tolist() for user_id, posicoes in self.posicoes.items()}
+        }
+        return partial(self._gravar, copia)
+
+    def _gravar(self, copia):
+        temporario = self.indice_file + ".tmp"
+        with open(temporario, 'w') as f:
+            json.dump(copia, f)
+        os.replace(temporario, self.indice_file)
+
+    def fechar(self):
+        self.preparar_salvamento()()
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import random
+import time
+
+import aiohttp
+
+
+class CircuitoAberto(Exception):
+    """Levantada quando o serviço remoto falhou demais e as chamadas estão suspensas"""
+
+
+class Circuito:
+    """Disjuntor: depois de `falhas_para_abrir` falhas seguidas, recusa chamadas por `tempo_aberto` segundos
+
+    Passado esse tempo, uma única chamada de teste é liberada; se ela der
+    certo o circuito fecha, se falhar ele abre de novo.
+    """
+
+    def __init__(self, falhas_para_abrir=5, tempo_aberto=30):
+        self.falhas_para_abrir = falhas_para_abrir
+        self.tempo_aberto = tempo_aberto
+        self.falhas = 0
+        self.aberto_ate = None
+        # Início da chamada de teste em andamento; expira para não travar se ela for cancelada
+        self.testando = None
+
+    def liberar(self):
+        if self.aberto_ate is None:
+            return
+        agora = time.monotonic()
+        if agora < self.aberto_ate or (self.testando is not None and agora - self.testando < self.tempo_aberto):
+            raise CircuitoAberto("Serviço de pagamentos indisponível, tente novamente em instantes")
+        self.testando = agora
+
+    def sucesso(self):
+        self.falhas = 0
+        self.aberto_ate = None
+        self.testando = None
+
+    def falha(self):
+        self.falhas += 1
+        if self.testando is not None or self.falhas >= self.falhas_para_abrir:
+            self.aberto_ate = time.monotonic() + self.tempo_aberto
+        self.testando = None
+
+
+class ClienteHTTP:
+    """Cliente HTTP com a vida do cog: conexões reaproveitadas, cache de DNS, retentativas e disjuntor"""
+
+    def __init__(self, base_url, headers=None, timeout_total=10, timeout_conexao=3, tentativas=3,
+                 espera_base=0.5, limite_conexoes=20, ttl_dns=300, circuito=None):
+        self.base_url = base_url.rstrip("/")
+        self.headers = headers or {}
+        self.timeout = aiohttp.ClientTimeout(total=timeout_total, connect=timeout_conexao)
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+        self.limite_conexoes = limite_conexoes
+        self.ttl_dns = ttl_dns
+        self.circuito = circuito or Circuito()
+        self.sessao = None
+
+    def _obter_sessao(self):
+        # Criada sob demanda para nascer dentro do event loop do bot
+        if self.sessao is None or self.sessao.closed:
+            conector = aiohttp.TCPConnector(
+                limit=self.limite_conexoes,
+                ttl_dns_cache=self.ttl_dns,
+                keepalive_timeout=30
+            )
+            self.sessao = aiohttp.ClientSession(
+                connector=conector,
+                headers=self.headers,
+                timeout=self.timeout
+            )
+        return self.sessao
+
+    @staticmethod
+    def _deve_repetir(status):
+        return status == 429 or status >= 500
+
+    @staticmethod
+    def _decodificar(texto):
+        try:
+            return json.loads(texto) if texto else None
+        except ValueError:
+            return None
+
+    async def requisitar(self, metodo, caminho, **kwargs):
+        """Faz a requisição e retorna (status, corpo JSON ou None)
+
+        Erros de rede, timeouts, 429 e 5xx são repetidos com espera exponencial
+        e jitter; esgotadas as tentativas, o último erro ou resposta é devolvido.
+        """
+        self.circuito.liberar()
+        sessao = self._obter_sessao()
+        url = f"{self.base_url}/{caminho.lstrip('/')}"
+
+        for tentativa in range(self.tentativas):
+            ultima = tentativa == self.tentativas - 1
+            try:
+                async with sessao.request(metodo, url, **kwargs) as response:
+                    dados = self._decodificar(await response.text())
+                    if not self._deve_repetir(response.status):
+                        self.circuito.sucesso()
+                        return response.status, dados
+                    if ultima:
+                        self.circuito.falha()
+                        return response.status, dados
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if ultima:
+                    self.circuito.falha()
+                    raise
+            # Jitter completo: espalha as retentativas de vários pedidos no tempo
+            await asyncio.sleep(random.uniform(0, self.espera_base * 2 ** tentativa))
+
+    async def fechar(self):
+        if self.sessao is not None and not self.sessao.closed:
+            await self.sessao.close()
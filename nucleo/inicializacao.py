@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+from datetime import datetime
+
+
+def memoria_rss_mb():
+    """Memória residente atual do processo em MB, ou None se não der para medir"""
+    try:
+        with open('/proc/self/status', 'r', encoding='utf-8') as f:
+            for linha in f:
+                if linha.startswith('VmRSS:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    # Fora do Linux só há o pico; o módulo resource não existe no Windows
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # No macOS ru_maxrss vem em bytes, nos outros Unix em KB
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def registrar_inicializacao(modo, segundos, servidores, membros_em_cache, arquivo='data/desempenho_inicializacao.json'):
+    """Grava o tempo e a memória da última inicialização no `modo` ("enxuto" ou "completo")
+
+    Retorna o texto do relatório, comparando com o outro modo se ele já tiver sido medido.
+    """
+    medicoes = {}
+    if os.path.exists(arquivo):
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            medicoes = json.load(f)
+
+    rss = memoria_rss_mb()
+    medicoes[modo] = {
+        "segundos": round(segundos, 2),
+        "rss_mb": round(rss, 1) if rss is not None else None,
+        "servidores": servidores,
+        "membros_em_cache": membros_em_cache,
+        "data": datetime.now().isoformat()
+    }
+    temporario = arquivo + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(medicoes, f, ensure_ascii=False, indent=4)
+    os.replace(temporario, arquivo)
+
+    linhas = ["Inicialização:"]
+    for nome in ("completo", "enxuto"):
+        if nome in medicoes:
+            m = medicoes[nome]
+            rss = f"{m['rss_mb']:.1f} MB" if m['rss_mb'] is not None else "RSS indisponível"
+            linhas.append(
+                f"  {nome:<9}{m['segundos']:>7.2f} s{rss:>18}"
+                f"  {m['servidores']} servidores, {m['membros_em_cache']} membros em cache"
+            )
+    if "completo" in medicoes and "enxuto" in medicoes:
+        completo, enxuto = medicoes["completo"], medicoes["enxuto"]
+        diferenca = f"  enxuto vs completo: {enxuto['segundos'] - completo['segundos']:+.2f} s"
+        if enxuto['rss_mb'] is not None and completo['rss_mb'] is not None:
+            diferenca += f", {enxuto['rss_mb'] - completo['rss_mb']:+.1f} MB"
+        linhas.append(diferenca)
+    return "\n".join(linhas)
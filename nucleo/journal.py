@@ -0,0 +1,140 @@
+import json
+import os
+
+
+class JournalContas:
+    """Journal append-only das contas com compactação em snapshot"""
+
+    def __init__(self, snapshot_file, journal_file, limite_entradas=1000):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        # Journal rotacionado enquanto o snapshot está sendo gravado
+        self.journal_rotacionado = journal_file + ".1"
+        self.limite_entradas = limite_entradas
+        self.entradas = 0
+        self._arquivo = None
+
+    def carregar(self):
+        """Carrega o último snapshot e reaplica o journal por cima dele"""
+        saldos = {}
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'r') as f:
+                saldos = json.load(f)
+
+        # O journal rotacionado só existe se uma compactação foi interrompida
+        self.entradas = self._reaplicar(self.journal_rotacionado, saldos)
+        self.entradas += self._reaplicar(self.journal_file, saldos)
+
+        self._arquivo = open(self.journal_file, 'a')
+        return saldos
+
+    def _reaplicar(self, caminho, saldos):
+        """Reaplica as mutações de um journal, descartando uma cauda corrompida"""
+        if not os.path.exists(caminho):
+            return 0
+
+        aplicadas = 0
+        posicao_valida = 0
+        with open(caminho, 'rb') as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    # Linha truncada por uma queda durante a escrita
+                    break
+                if not linha.endswith(b"\n"):
+                    break
+                for user_id, conta in registro["contas"].items():
+                    if conta is None:
+                        saldos.pop(user_id, None)
+                    else:
+                        saldos[user_id] = conta
+                aplicadas += 1
+                posicao_valida += len(linha)
+
+        # Remove a cauda inválida para que novas entradas não se misturem a ela
+        if posicao_valida < os.path.getsize(caminho):
+            with open(caminho, 'r+b') as f:
+                f.truncate(posicao_valida)
+        return aplicadas
+
+    def registrar(self, contas):
+        """Acrescenta ao journal o estado atual apenas das contas alteradas"""
+        self.registrar_lote([contas])
+
+    def registrar_lote(self, lista_contas):
+        """Acrescenta várias mutações ao journal com uma única escrita; se ela falhar, nada fica no arquivo"""
+        if not lista_contas:
+            return
+        marca = self.marca()
+        try:
+            self._arquivo.write("".join(json.dumps({"contas": contas}, default=str) + "\n" for contas in lista_contas))
+            self._arquivo.flush()
+        except Exception:
+            self.desfazer(marca)
+            raise
+        self.entradas += len(lista_contas)
+
+    def marca(self):
+        """Ponto atual do journal, para `desfazer` o que for escrito depois dele"""
+        # Cada escrita termina com flush, então o tamanho em disco é a posição de escrita
+        return os.path.getsize(self.journal_file), self.entradas
+
+    def desfazer(self, marca):
+        """Descarta tudo que foi escrito no journal depois de `marca`"""
+        posicao, entradas = marca
+        try:
+            self._arquivo.close()
+        except OSError:
+            # O buffer com a escrita que falhou é descartado junto
+            pass
+        with open(self.journal_file, 'r+b') as f:
+            f.truncate(posicao)
+        self._arquivo = open(self.journal_file, 'a')
+        self.entradas = entradas
+
+    @property
+    def precisa_compactar(self):
+        return self.entradas >= self.limite_entradas
+
+    def iniciar_compactacao(self):
+        """Rotaciona o journal; as próximas mutações vão para um journal vazio"""
+        self._arquivo.close()
+        if os.path.exists(self.journal_rotacionado):
+            # Uma compactação anterior falhou: junta os dois journals
+            with open(self.journal_file, 'rb') as origem, open(self.journal_rotacionado, 'ab') as destino:
+                destino.write(origem.read())
+            os.remove(self.journal_file)
+        elif os.path.exists(self.journal_file):
+            os.replace(self.journal_file, self.journal_rotacionado)
+
+        self._arquivo = open(self.journal_file, 'a')
+        self.entradas = 0
+
+    def gravar_snapshot(self):
+        """Funde o snapshot com o journal rotacionado, grava o resultado de forma atômica e descarta o rotacionado
+
+        O snapshot sai só do que já estava no disco: mutações ainda em voo, que
+        podem ser desfeitas, nunca entram nele.
+        """
+        copia = {}
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'r') as f:
+                copia = json.load(f)
+        self._reaplicar(self.journal_rotacionado, copia)
+
+        temporario = self.snapshot_file + ".tmp"
+        with open(temporario, 'w') as f:
+            json.dump(copia, f, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.snapshot_file)
+
+        if os.path.exists(self.journal_rotacionado):
+            os.remove(self.journal_rotacionado)
+
+    def fechar(self):
+        """Fecha o arquivo do journal"""
+        if self._arquivo:
+            self._arquivo.close()
+            self._arquivo = None
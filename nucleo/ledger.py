@@ -0,0 +1,352 @@
+import gzip
+import json
+import os
+import re
+from datetime import datetime, timedelta
+
+TAMANHO_BLOCO = 64 * 1024
+
+# Campos dos detalhes de uma transação que identificam os usuários envolvidos
+CAMPOS_USUARIO = ("user_id", "remetente_id", "destinatario_id")
+
+
+def usuarios_da_transacao(detalhes):
+    """Retorna os IDs dos usuários envolvidos em uma transação"""
+    return {str(detalhes[campo]) for campo in CAMPOS_USUARIO if campo in detalhes}
+
+
+def ler_linha_log(linha):
+    """Separa uma linha do antigo transactions.log em (data ISO, tipo, detalhes)"""
+    data, _, mensagem = linha.rstrip("\r\n").split(" - ", 2)
+    tipo, _, detalhes = mensagem.partition(": ")
+    data = datetime.strptime(data, "%Y-%m-%d %H:%M:%S,%f").isoformat()
+    return data, tipo, json.loads(detalhes)
+
+
+def ler_historico_legado(ledger_antigo, log_file):
+    """Gera (data, tipo, detalhes) do ledger em arquivo único ou, na falta dele, do transactions.log"""
+    if os.path.exists(ledger_antigo):
+        with open(ledger_antigo, 'rb') as f:
+            for linha in f:
+                if not linha.endswith(b"\n"):
+                    break
+                registro = json.loads(linha)
+                yield registro["data"], registro["tipo"], registro["detalhes"]
+    elif os.path.exists(log_file):
+        with open(log_file, 'r') as f:
+            for line in f:
+                try:
+                    yield ler_linha_log(line)
+                except ValueError:
+                    continue
+
+
+def _ler_de_tras_para_frente(f, tamanho):
+    """Gera (offset, linha) de um arquivo binário do fim para o começo"""
+    posicao = tamanho
+    resto = b""
+    while posicao > 0:
+        inicio = max(posicao - TAMANHO_BLOCO, 0)
+        f.seek(inicio)
+        bloco = f.read(posicao - inicio) + resto
+        linhas = bloco.split(b"\n")
+        # A primeira linha do bloco pode estar incompleta, exceto no início do arquivo
+        resto = linhas.pop(0) if inicio > 0 else b""
+        offset = inicio + len(resto) + (1 if inicio > 0 else 0)
+        completas = []
+        for linha in linhas:
+            completas.append((offset, linha))
+            offset += len(linha) + 1
+        for offset_linha, linha in reversed(completas):
+            if linha:
+                yield offset_linha, linha
+        posicao = inicio
+
+
+class Segmento:
+    """Segmento fechado do ledger, descrito pelo seu índice lateral (.idx.json)"""
+
+    def __init__(self, diretorio, numero, meta, comprimido):
+        self.numero = numero
+        self.base = os.path.join(diretorio, f"segmento-{numero:06d}")
+        self.meta = meta
+        self.usuarios = set(meta["usuarios"])
+        self.comprimido = comprimido
+
+    @property
+    def caminho(self):
+        return self.base + (".ndjson.gz" if self.comprimido else ".ndjson")
+
+    def contem(self, user_id):
+        return user_id in self.usuarios
+
+    def no_intervalo(self, inicio, fim):
+        return self.meta["inicio"] <= fim and self.meta["fim"] >= inicio
+
+    def ler(self):
+        """Percorre os registros do segmento em ordem"""
+        abrir = gzip.open if self.comprimido else open
+        with abrir(self.caminho, 'rb') as f:
+            for linha in f:
+                if linha.strip():
+                    yield json.loads(linha)
+
+    def ler_do_fim(self):
+        """Percorre os registros do segmento do mais novo para o mais antigo"""
+        if self.comprimido:
+            # O gzip não permite buscar a partir do fim; o segmento é descomprimido inteiro
+            yield from reversed(list(self.ler()))
+            return
+        with open(self.caminho, 'rb') as f:
+            for _, linha in _ler_de_tras_para_frente(f, os.path.getsize(self.caminho)):
+                yield json.loads(linha)
+
+
+class Ledger:
+    """Ledger append-only em NDJSON, dividido em segmentos rotacionados
+
+    Cada registro tem o formato {"seq", "data", "tipo", "detalhes"}, com `seq`
+    monotônico. Só o segmento ativo recebe escritas; seus registros são
+    identificados pelo offset em bytes. Ao rotacionar, o segmento ganha um
+    índice lateral com os usuários presentes, o intervalo de datas e de seq,
+    e pode ser comprimido com gzip.
+    """
+
+    def __init__(self, diretorio='data/ledger', tamanho_max=8 * 1024 * 1024, idade_max=timedelta(days=1), comprimir=False):
+        self.diretorio = diretorio
+        self.tamanho_max = tamanho_max
+        self.idade_max = idade_max
+        self.comprimir = comprimir
+        self.proximo_seq = 1
+        os.makedirs(diretorio, exist_ok=True)
+
+        self.segmentos = []
+        numeros = set()
+        for nome in os.listdir(diretorio):
+            encontrado = re.fullmatch(r"segmento-(\d+)\.ndjson(\.gz)?", nome)
+            if encontrado:
+                numeros.add(int(encontrado.group(1)))
+
+        self.numero_ativo = max(numeros) if numeros else 1
+        for numero in sorted(numeros - {self.numero_ativo}):
+            self.segmentos.append(self._abrir_segmento(numero))
+
+        self._recuperar_ativo()
+        self._arquivo = open(self.arquivo, 'ab')
+
+    @property
+    def arquivo(self):
+        return os.path.join(self.diretorio, f"segmento-{self.numero_ativo:06d}.ndjson")
+
+    def _abrir_segmento(self, numero):
+        base = os.path.join(self.diretorio, f"segmento-{numero:06d}")
+        comprimido = not os.path.exists(base + ".ndjson")
+        if os.path.exists(base + ".idx.json"):
+            with open(base + ".idx.json", 'r') as f:
+                meta = json.load(f)
+        else:
+            # Índice lateral perdido: reconstrói a partir do próprio segmento
+            meta = self._descrever(Segmento(self.diretorio, numero, {"usuarios": []}, comprimido).ler())
+            self._gravar_meta(base, meta)
+        return Segmento(self.diretorio, numero, meta, comprimido)
+
+    @staticmethod
+    def _descrever(registros):
+        meta = {"usuarios": set(), "inicio": None, "fim": None, "primeiro_seq": None, "ultimo_seq": None}
+        for registro in registros:
+            meta["usuarios"].update(usuarios_da_transacao(registro["detalhes"]))
+            if meta["primeiro_seq"] is None:
+                meta["primeiro_seq"] = registro["seq"]
+                meta["inicio"] = registro["data"]
+            meta["ultimo_seq"] = registro["seq"]
+            meta["fim"] = registro["data"]
+        return meta
+
+    @staticmethod
+    def _gravar_meta(base, meta):
+        meta = dict(meta, usuarios=sorted(meta["usuarios"]))
+        with open(base + ".idx.json.tmp", 'w') as f:
+            json.dump(meta, f)
+        os.replace(base + ".idx.json.tmp", base + ".idx.json")
+
+    def _recuperar_ativo(self):
+        """Descarta uma linha incompleta no fim e retoma a sequência e a descrição do segmento ativo"""
+        self.tamanho = 0
+        if os.path.exists(self.arquivo):
+            tamanho = os.path.getsize(self.arquivo)
+            with open(self.arquivo, 'rb') as f:
+                fim_valido = self._fim_da_ultima_linha(f, tamanho)
+            if fim_valido < tamanho:
+                with open(self.arquivo, 'r+b') as f:
+                    f.truncate(fim_valido)
+            self.tamanho = fim_valido
+
+        self.meta_ativo = self._descrever(registro for _, registro in self.ler_a_partir_de(0))
+        if self.meta_ativo["ultimo_seq"] is not None:
+            self.proximo_seq = self.meta_ativo["ultimo_seq"] + 1
+        elif self.segmentos:
+            self.proximo_seq = self.segmentos[-1].meta["ultimo_seq"] + 1
+
+    @staticmethod
+    def _fim_da_ultima_linha(f, tamanho):
+        posicao = tamanho
+        while posicao > 0:
+            inicio = max(posicao - TAMANHO_BLOCO, 0)
+            f.seek(inicio)
+            bloco = f.read(posicao - inicio)
+            quebra = bloco.rfind(b"\n")
+            if quebra != -1:
+                return inicio + quebra + 1
+            posicao = inicio
+        return 0
+
+    def _precisa_rotacionar(self, data):
+        if self.tamanho == 0:
+            return False
+        if self.tamanho >= self.tamanho_max:
+            return True
+        inicio = datetime.fromisoformat(self.meta_ativo["inicio"])
+        return datetime.fromisoformat(data) - inicio >= self.idade_max
+
+    def rotacionar(self):
+        """Fecha o segmento ativo, grava seu índice lateral e abre um novo"""
+        self._arquivo.close()
+        base = os.path.join(self.diretorio, f"segmento-{self.numero_ativo:06d}")
+        self._gravar_meta(base, self.meta_ativo)
+        self.segmentos.append(Segmento(self.diretorio, self.numero_ativo, dict(self.meta_ativo), False))
+
+        self.numero_ativo += 1
+        self.tamanho = 0
+        self.meta_ativo = self._descrever(())
+        self._arquivo = open(self.arquivo, 'ab')
+
+    def acrescentar(self, transacoes, data=None):
+        """Acrescenta transações [(tipo, detalhes)] e retorna [(offset, registro)] no segmento ativo"""
+        data = data or datetime.now().isoformat()
+        if self._precisa_rotacionar(data):
+            self.rotacionar()
+
+        escritos = []
+        conteudo = []
+        tamanho, proximo_seq = self.tamanho, self.proximo_seq
+        try:
+            for tipo, detalhes in transacoes:
+                registro = {"seq": self.proximo_seq, "data": data, "tipo": tipo, "detalhes": detalhes}
+                linha = (json.dumps(registro, default=str, ensure_ascii=False) + "\n").encode('utf-8')
+                escritos.append((self.tamanho, registro))
+                conteudo.append(linha)
+                self.proximo_seq += 1
+                self.tamanho += len(linha)
+
+            self._arquivo.write(b"".join(conteudo))
+            self._arquivo.flush()
+        except Exception:
+            # Tudo ou nada: o segmento volta ao tamanho anterior e a sequência não avança
+            self.desfazer(tamanho)
+            self.proximo_seq = proximo_seq
+            raise
+
+        registros = [registro for _, registro in escritos]
+        novo = self._descrever(registros)
+        self.meta_ativo["usuarios"].update(novo["usuarios"])
+        if self.meta_ativo["primeiro_seq"] is None:
+            self.meta_ativo.update(primeiro_seq=novo["primeiro_seq"], inicio=novo["inicio"])
+        if novo["ultimo_seq"] is not None:
+            self.meta_ativo.update(ultimo_seq=novo["ultimo_seq"], fim=novo["fim"])
+        return escritos
+
+    def desfazer(self, tamanho):
+        """Trunca o segmento ativo em `tamanho`, descartando uma escrita que falhou"""
+        try:
+            self._arquivo.close()
+        except OSError:
+            pass
+        with open(self.arquivo, 'r+b') as f:
+            f.truncate(tamanho)
+        self.tamanho = tamanho
+        self._arquivo = open(self.arquivo, 'ab')
+
+    def ler(self, offset):
+        """Lê o registro do segmento ativo que começa em `offset`"""
+        return self.ler_varios([offset])[0]
+
+    def ler_varios(self, offsets):
+        """Lê vários registros do segmento ativo com um único arquivo aberto"""
+        registros = []
+        with open(self.arquivo, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                registros.append(json.loads(f.readline()))
+        return registros
+
+    def ler_a_partir_de(self, offset=0):
+        """Percorre os registros do segmento ativo a partir de `offset`, gerando (offset, registro)"""
+        if not os.path.exists(self.arquivo):
+            return
+        with open(self.arquivo, 'rb') as f:
+            f.seek(offset)
+            for linha in f:
+                if offset + len(linha) > self.tamanho:
+                    break
+                yield offset, json.loads(linha)
+                offset += len(linha)
+
+    def ler_tudo(self):
+        """Percorre todos os registros, do segmento mais antigo ao ativo"""
+        for segmento in list(self.segmentos):
+            yield from segmento.ler()
+        for _, registro in self.ler_a_partir_de(0):
+            yield registro
+
+    def ler_do_fim(self):
+        """Percorre todos os registros do mais novo para o mais antigo"""
+        if os.path.exists(self.arquivo):
+            with open(self.arquivo, 'rb') as f:
+                for _, linha in _ler_de_tras_para_frente(f, self.tamanho):
+                    yield json.loads(linha)
+        for segmento in reversed(self.segmentos):
+            yield from segmento.ler_do_fim()
+
+    def segmentos_do_usuario(self, user_id):
+        """Segmentos fechados que contêm o usuário, do mais novo para o mais antigo"""
+        return [segmento for segmento in reversed(self.segmentos) if segmento.contem(user_id)]
+
+    def segmentos_no_intervalo(self, inicio, fim):
+        """Segmentos fechados com registros entre as datas ISO `inicio` e `fim`"""
+        return [segmento for segmento in self.segmentos if segmento.no_intervalo(inicio, fim)]
+
+    def pendentes_de_compressao(self):
+        if not self.comprimir:
+            return []
+        return [segmento for segmento in self.segmentos if not segmento.comprimido]
+
+    @staticmethod
+    def comprimir_segmento(segmento):
+        """Gera a versão .gz de um segmento fechado, sem tocar no original"""
+        with open(segmento.caminho, 'rb') as origem, gzip.open(segmento.base + ".ndjson.gz.tmp", 'wb') as destino:
+            while True:
+                bloco = origem.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                destino.write(bloco)
+
+    @staticmethod
+    def trocar_por_comprimido(segmento):
+        """Passa a usar a versão comprimida e remove o segmento original"""
+        original = segmento.caminho
+        os.replace(segmento.base + ".ndjson.gz.tmp", segmento.base + ".ndjson.gz")
+        segmento.comprimido = True
+        os.remove(original)
+
+    def migrar(self, ledger_antigo, log_file):
+        """Importa o antigo ledger em arquivo único ou, na falta dele, o transactions.log"""
+        migradas = 0
+        for data, tipo, detalhes in ler_historico_legado(ledger_antigo, log_file):
+            self.acrescentar([(tipo, detalhes)], data=data)
+            migradas += 1
+        if os.path.exists(ledger_antigo):
+            os.replace(ledger_antigo, ledger_antigo + ".migrado")
+        return migradas
+
+    def fechar(self):
+        self._arquivo.close()
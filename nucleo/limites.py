@@ -0,0 +1,91 @@
+import time
+from collections import OrderedDict
+
+from discord.ext import commands
+
+
+class LimiteExcedido(commands.CheckFailure):
+    """Levantada quando um comando passa do limite de uso"""
+
+    def __init__(self, comando, espera):
+        self.comando = comando
+        self.espera = espera
+        super().__init__(f"Limite de uso de {comando} atingido, tente novamente em {espera:.1f}s")
+
+
+class BaldeTokens:
+    """Balde de tokens por chave: `capacidade` usos que se recarregam ao longo de `periodo` segundos
+
+    Cada chave guarda só (tokens, instante). As chaves ficam em ordem de uso,
+    então as que já recarregaram por completo estão sempre no começo e são
+    descartadas sob demanda; usuários parados não ocupam memória.
+    """
+
+    def __init__(self, capacidade, periodo):
+        self.capacidade = capacidade
+        self.periodo = periodo
+        self.taxa = capacidade / periodo
+        self.baldes = OrderedDict()
+
+    def _expirar(self, agora):
+        while self.baldes:
+            chave, (_, instante) = next(iter(self.baldes.items()))
+            if agora - instante < self.periodo:
+                break
+            del self.baldes[chave]
+
+    def consumir(self, chave, agora=None):
+        """Consome um token da chave; retorna 0 se permitido ou os segundos até o próximo token"""
+        agora = time.monotonic() if agora is None else agora
+        self._expirar(agora)
+
+        tokens, instante = self.baldes.get(chave, (self.capacidade, agora))
+        tokens = min(self.capacidade, tokens + (agora - instante) * self.taxa)
+        if tokens < 1:
+            return (1 - tokens) / self.taxa
+
+        self.baldes[chave] = (tokens - 1, agora)
+        self.baldes.move_to_end(chave)
+        return 0
+
+    def devolver(self, chave):
+        """Devolve o token de um uso que acabou não acontecendo"""
+        if chave in self.baldes:
+            tokens, instante = self.baldes[chave]
+            self.baldes[chave] = (min(self.capacidade, tokens + 1), instante)
+
+    def __len__(self):
+        return len(self.baldes)
+
+
+class Limitador:
+    """Limites de uso por comando, por usuário e/ou por servidor
+
+    `regras` mapeia o nome do comando para {"usuario": (capacidade, periodo),
+    "servidor": (capacidade, periodo)}; qualquer um dos escopos é opcional.
+    """
+
+    def __init__(self, regras):
+        self.baldes = {
+            comando: {escopo: BaldeTokens(*limite) for escopo, limite in escopos.items()}
+            for comando, escopos in regras.items()
+        }
+
+    def verificar(self, ctx):
+        """Consome um uso do comando para o contexto ou levanta LimiteExcedido"""
+        baldes = self.baldes.get(ctx.command.qualified_name)
+        if not baldes:
+            return True
+
+        chaves = {"usuario": ctx.author.id, "servidor": ctx.guild.id if ctx.guild else ctx.author.id}
+        consumidos = []
+        agora = time.monotonic()
+        for escopo, balde in baldes.items():
+            espera = balde.consumir(chaves[escopo], agora)
+            if espera:
+                # Um escopo negado não deve gastar os tokens dos outros
+                for anterior, chave in consumidos:
+                    anterior.devolver(chave)
+                raise LimiteExcedido(ctx.command.qualified_name, espera)
+            consumidos.append((balde, chaves[escopo]))
+        return True
@@ -0,0 +1,238 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from nucleo.dinheiro import para_centavos
+
+
+class ArmazenamentoLoja:
+    """Banco SQLite da loja (data/loja.db), em modo WAL
+
+    Guarda o catálogo de produtos, os pagamentos PIX em andamento, as
+    reservas de estoque e os menus publicados para que sobrevivam a reinícios.
+    Todas as operações são bloqueantes e devem rodar no executor de
+    persistência; a conexão é protegida por `trava`.
+    """
+
+    # 1: pagamentos pendentes; 2: reservas de estoque; 3: catálogo de produtos; 4: menus publicados;
+    # 5: nome do produto guardado com o pagamento; 6: remove os índices de produtos sem uso
+    VERSAO_SCHEMA = 6
+
+    def __init__(self, db_file='data/loja.db', produtos_dir='data/produtos'):
+        self.produtos_dir = produtos_dir
+        self.trava = threading.Lock()
+        self.conexao = sqlite3.connect(db_file, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+
+        versao = self.conexao.execute("PRAGMA user_version").fetchone()[0]
+        if versao < self.VERSAO_SCHEMA:
+            self.conexao.execute("BEGIN")
+            with self.conexao:
+                self.migrar_schema(versao)
+                self.conexao.execute(f"PRAGMA user_version = {self.VERSAO_SCHEMA}")
+
+    def migrar_schema(self, versao):
+        if versao < 1:
+            for comando in (
+                """CREATE TABLE pagamentos (
+                    payment_id TEXT PRIMARY KEY,
+                    produto_id TEXT NOT NULL,
+                    valor_centavos INTEGER NOT NULL,
+                    usuario INTEGER NOT NULL,
+                    canal INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    criado_em TEXT NOT NULL,
+                    expira_em TEXT NOT NULL
+                ) WITHOUT ROWID""",
+                "CREATE INDEX pagamentos_status_criado ON pagamentos (status, criado_em)",
+            ):
+                self.conexao.execute(comando)
+        if versao < 2:
+            for comando in (
+                "ALTER TABLE pagamentos ADD COLUMN reserva TEXT",
+                """CREATE TABLE reservas (
+                    reserva_id TEXT PRIMARY KEY,
+                    produto_id TEXT NOT NULL,
+                    usuario INTEGER NOT NULL,
+                    expira_em TEXT NOT NULL
+                ) WITHOUT ROWID""",
+            ):
+                self.conexao.execute(comando)
+        if versao < 3:
+            # AUTOINCREMENT nunca reaproveita o ID de um produto removido
+            self.conexao.execute(
+                """CREATE TABLE produtos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    nome TEXT NOT NULL,
+                    preco_centavos INTEGER NOT NULL,
+                    estoque INTEGER NOT NULL,
+                    descricao TEXT NOT NULL,
+                    data_criacao TEXT NOT NULL
+                )"""
+            )
+            self.migrar_produtos()
+        if versao < 4:
+            self.conexao.execute(
+                """CREATE TABLE menus (
+                    message_id INTEGER PRIMARY KEY,
+                    canal_id INTEGER NOT NULL,
+                    pagina INTEGER NOT NULL
+                )"""
+            )
+        if versao < 5:
+            # O produto pode ser removido com o PIX em aberto; a venda ainda precisa do nome
+            self.conexao.execute("ALTER TABLE pagamentos ADD COLUMN produto_nome TEXT")
+        if versao < 6:
+            # O catálogo é lido inteiro por id e servido da memória; índices por nome e
+            # estoque só custavam escrita (bancos novos já não os criam)
+            for comando in ("DROP INDEX IF EXISTS produtos_nome", "DROP INDEX IF EXISTS produtos_em_estoque"):
+                self.conexao.execute(comando)
+
+    def migrar_produtos(self):
+        """Importa os produtos do antigo formato de um arquivo JSON por produto"""
+        if not os.path.isdir(self.produtos_dir):
+            return
+        migrados = 0
+        for nome in sorted(os.listdir(self.produtos_dir)):
+            if not nome.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.produtos_dir, nome), 'r', encoding='utf-8') as f:
+                    produto = json.load(f)
+                # Produtos antigos guardavam o preço em reais (float)
+                if 'preco' in produto:
+                    produto['preco_centavos'] = para_centavos(produto.pop('preco'))
+                self.conexao.execute(
+                    """INSERT OR REPLACE INTO produtos (id, nome, preco_centavos, estoque, descricao, data_criacao)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (int(produto['id']), produto['nome'], produto['preco_centavos'], produto['estoque'],
+                     produto['descricao'], produto.get('data_criacao', datetime.now().isoformat()))
+                )
+                migrados += 1
+            except Exception as e:
+                print(f"Erro ao migrar produto {nome}: {str(e)}")
+        if migrados:
+            print(f"Migrados {migrados} produtos de {self.produtos_dir} para o loja.db")
+
+    def carregar_produtos(self):
+        with self.trava:
+            cursor = self.conexao.execute(
+                "SELECT id, nome, preco_centavos, estoque, descricao, data_criacao FROM produtos ORDER BY id"
+            )
+            return {
+                str(produto_id): {
+                    "id": str(produto_id),
+                    "nome": nome,
+                    "preco_centavos": preco_centavos,
+                    "estoque": estoque,
+                    "descricao": descricao,
+                    "data_criacao": data_criacao
+                }
+                for produto_id, nome, preco_centavos, estoque, descricao, data_criacao in cursor
+            }
+
+    def criar_produto(self, dados):
+        """Insere um produto e retorna o ID alocado, sempre maior que todos os anteriores"""
+        with self.trava, self.conexao:
+            cursor = self.conexao.execute(
+                """INSERT INTO produtos (nome, preco_centavos, estoque, descricao, data_criacao)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (dados['nome'], dados['preco_centavos'], dados['estoque'], dados['descricao'], dados['data_criacao'])
+            )
+            return str(cursor.lastrowid)
+
+    def gravar_produtos(self, lote):
+        """Grava um lote de (produto_id, dados) em uma transação; dados=None remove o produto"""
+        # Só a última versão de cada produto vai para o disco
+        ultimas_versoes = dict(lote)
+        with self.trava, self.conexao:
+            for produto_id, dados in ultimas_versoes.items():
+                if dados is None:
+                    self.conexao.execute("DELETE FROM produtos WHERE id = ?", (int(produto_id),))
+                else:
+                    self.conexao.execute(
+                        """UPDATE produtos SET nome = ?, preco_centavos = ?, estoque = ?, descricao = ?
+                           WHERE id = ?""",
+                        (dados['nome'], dados['preco_centavos'], dados['estoque'], dados['descricao'], int(produto_id))
+                    )
+
+    def carregar_pendentes(self):
+        """Retorna os pagamentos ainda pendentes, dos mais antigos para os mais novos"""
+        with self.trava:
+            cursor = self.conexao.execute(
+                """SELECT payment_id, produto_id, produto_nome, valor_centavos, usuario, canal, criado_em, expira_em, reserva
+                   FROM pagamentos WHERE status = 'pendente' ORDER BY criado_em"""
+            )
+            return {
+                payment_id: {
+                    'produto_id': produto_id,
+                    'produto_nome': produto_nome,
+                    'valor_centavos': valor_centavos,
+                    'usuario': usuario,
+                    'canal': canal,
+                    'timestamp': datetime.fromisoformat(criado_em),
+                    'expira_em': datetime.fromisoformat(expira_em),
+                    'reserva': reserva
+                }
+                for payment_id, produto_id, produto_nome, valor_centavos, usuario, canal, criado_em, expira_em, reserva in cursor
+            }
+
+    def registrar_pendente(self, payment_id, info):
+        with self.trava, self.conexao:
+            self.conexao.execute(
+                """INSERT OR REPLACE INTO pagamentos
+                   (payment_id, produto_id, produto_nome, valor_centavos, usuario, canal, status, criado_em, expira_em, reserva)
+                   VALUES (?, ?, ?, ?, ?, ?, 'pendente', ?, ?, ?)""",
+                (payment_id, info['produto_id'], info.get('produto_nome'), info['valor_centavos'], info['usuario'], info['canal'],
+                 info['timestamp'].isoformat(), info['expira_em'].isoformat(), info.get('reserva'))
+            )
+
+    def atualizar_status(self, payment_ids, status):
+        """Marca pagamentos como 'aprovado', 'expirado' ou 'cancelado'"""
+        with self.trava, self.conexao:
+            self.conexao.executemany(
+                "UPDATE pagamentos SET status = ? WHERE payment_id = ?",
+                [(status, payment_id) for payment_id in payment_ids]
+            )
+
+    def carregar_reservas(self):
+        with self.trava:
+            cursor = self.conexao.execute("SELECT reserva_id, produto_id, usuario, expira_em FROM reservas")
+            return {
+                reserva_id: (produto_id, usuario, datetime.fromisoformat(expira_em))
+                for reserva_id, produto_id, usuario, expira_em in cursor
+            }
+
+    def registrar_reserva(self, reserva_id, produto_id, usuario, expira_em):
+        with self.trava, self.conexao:
+            self.conexao.execute(
+                "INSERT INTO reservas (reserva_id, produto_id, usuario, expira_em) VALUES (?, ?, ?, ?)",
+                (reserva_id, produto_id, usuario, expira_em.isoformat())
+            )
+
+    def remover_reservas(self, reserva_ids):
+        with self.trava, self.conexao:
+            self.conexao.executemany("DELETE FROM reservas WHERE reserva_id = ?", [(reserva_id,) for reserva_id in reserva_ids])
+
+    def carregar_menus(self):
+        with self.trava:
+            cursor = self.conexao.execute("SELECT message_id, canal_id, pagina FROM menus")
+            return {message_id: {'canal': canal_id, 'pagina': pagina} for message_id, canal_id, pagina in cursor}
+
+    def salvar_menu(self, message_id, canal_id, pagina):
+        with self.trava, self.conexao:
+            self.conexao.execute(
+                "INSERT OR REPLACE INTO menus (message_id, canal_id, pagina) VALUES (?, ?, ?)",
+                (message_id, canal_id, pagina)
+            )
+
+    def remover_menu(self, message_id):
+        with self.trava, self.conexao:
+            self.conexao.execute("DELETE FROM menus WHERE message_id = ?", (message_id,))
+
+    def fechar(self):
+        with self.trava:
+            self.conexao.close()
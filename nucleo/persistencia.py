@@ -0,0 +1,70 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+class Persistencia:
+    """Executor limitado, compartilhado pelos cogs, para o I/O de disco"""
+
+    def __init__(self, max_workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="persistencia")
+
+    async def executar(self, funcao, *args, **kwargs):
+        """Executa uma função bloqueante em uma thread do executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(funcao, *args, **kwargs))
+
+
+_persistencia = None
+
+
+def obter_persistencia():
+    """Retorna a instância compartilhada da camada de persistência"""
+    global _persistencia
+    if _persistencia is None:
+        _persistencia = Persistencia()
+    return _persistencia
+
+
+class EscritorEmLote:
+    """Agrupa escritas que chegam próximas em uma única ida ao disco"""
+
+    def __init__(self, gravar_lote, janela=0.05, persistencia=None):
+        self.gravar_lote = gravar_lote
+        self.janela = janela
+        self.persistencia = persistencia or obter_persistencia()
+        self.pendentes = []
+        self.tarefa = None
+
+    def enfileirar(self, item):
+        """Agenda a escrita de um item; o future termina quando ele estiver no disco"""
+        futuro = asyncio.get_running_loop().create_future()
+        self.pendentes.append((item, futuro))
+        # Uma única tarefa de descarga por vez mantém a ordem das escritas
+        if self.tarefa is None or self.tarefa.done():
+            self.tarefa = asyncio.create_task(self._descarregar())
+        return futuro
+
+    async def _descarregar(self):
+        await asyncio.sleep(self.janela)
+        while self.pendentes:
+            lote, self.pendentes = self.pendentes, []
+            try:
+                await self.persistencia.executar(self.gravar_lote, [item for item, _ in lote])
+            except Exception as e:
+                print(f"Erro ao gravar lote: {str(e)}")
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+            else:
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_result(None)
+
+    async def fechar(self):
+        """Grava imediatamente tudo que estiver pendente"""
+        self.janela = 0
+        if self.tarefa and not self.tarefa.done():
+            await self.tarefa
+        elif self.pendentes:
+            await self._descarregar()
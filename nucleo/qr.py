@@ -0,0 +1,31 @@
+from functools import lru_cache
+from io import BytesIO
+
+import qrcode
+
+
+@lru_cache(maxsize=128)
+def gerar_qrcode(conteudo, compacto=False):
+    """Gera o PNG do QR Code; o resultado fica em cache para reenvios do mesmo pagamento
+
+    No modo compacto os módulos são menores e a imagem é salva em 1 bit por
+    pixel, o que reduz bastante o arquivo enviado ao Discord. A borda fica nos
+    4 módulos exigidos pela especificação, sem ela alguns apps de banco não leem.
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=6 if compacto else 10,
+        border=4,
+    )
+    qr.add_data(conteudo)
+    qr.make(fit=True)
+
+    # Em preto e branco a imagem gerada já tem 1 bit por pixel
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffered = BytesIO()
+    if compacto:
+        img.save(buffered, format="PNG", optimize=True)
+    else:
+        img.save(buffered, format="PNG", quality=100)
+    return buffered.getvalue()
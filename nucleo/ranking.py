@@ -0,0 +1,49 @@
+from bisect import bisect_left, insort
+
+
+class Ranking:
+    """Ranking de saldos mantido ordenado a cada alteração
+
+    As chaves são (-saldo, user_id), então a lista fica do maior saldo para o
+    menor, com empate decidido pelo ID. Atualizar uma conta custa uma busca
+    binária e um deslocamento da lista; o top N é um recorte e a posição de um
+    usuário é uma busca binária.
+    """
+
+    def __init__(self, contas=None):
+        # user_id -> chave atual na lista ordenada
+        self.chaves = {}
+        self.ordenado = []
+        if contas:
+            self.chaves = {user_id: (-conta["saldo_centavos"], user_id) for user_id, conta in contas.items()}
+            self.ordenado = sorted(self.chaves.values())
+
+    def __len__(self):
+        return len(self.ordenado)
+
+    def atualizar(self, user_id, saldo_centavos):
+        """Insere ou reposiciona a conta com o novo saldo"""
+        nova = (-saldo_centavos, user_id)
+        antiga = self.chaves.get(user_id)
+        if antiga == nova:
+            return
+        if antiga is not None:
+            del self.ordenado[bisect_left(self.ordenado, antiga)]
+        insort(self.ordenado, nova)
+        self.chaves[user_id] = nova
+
+    def remover(self, user_id):
+        antiga = self.chaves.pop(user_id, None)
+        if antiga is not None:
+            del self.ordenado[bisect_left(self.ordenado, antiga)]
+
+    def topo(self, quantidade=10):
+        """Retorna [(user_id, saldo_centavos)] das maiores contas"""
+        return [(user_id, -saldo) for saldo, user_id in self.ordenado[:quantidade]]
+
+    def posicao(self, user_id):
+        """Retorna a posição do usuário no ranking (1 = maior saldo) ou None"""
+        chave = self.chaves.get(user_id)
+        if chave is None:
+            return None
+        return bisect_left(self.ordenado, chave) + 1
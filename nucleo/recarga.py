@@ -0,0 +1,35 @@
+from contextlib import contextmanager
+
+# Estado entregue pelos cogs durante uma recarga: extensão -> estado
+# Este módulo não é uma extensão, então sobrevive à recarga dos cogs.
+_estados = {}
+_em_recarga = set()
+
+
+@contextmanager
+def recarregando(extensao):
+    """Marca a extensão como em recarga enquanto `bot.reload_extension` roda
+
+    O estado guardado só vale durante a recarga; se a nova versão falhar e o
+    discord.py voltar à antiga, ela também encontra o estado.
+    """
+    _em_recarga.add(extensao)
+    try:
+        yield
+    finally:
+        _em_recarga.discard(extensao)
+        _estados.pop(extensao, None)
+
+
+def em_recarga(extensao):
+    return extensao in _em_recarga
+
+
+def guardar(extensao, estado):
+    """Guarda o estado do cog antigo para a nova instância"""
+    _estados[extensao] = estado
+
+
+def retomar(extensao):
+    """Retorna o estado entregue pelo cog antigo, ou None fora de uma recarga"""
+    return _estados.get(extensao)
@@ -0,0 +1,60 @@
+import heapq
+import uuid
+from collections import Counter
+
+
+class Reservas:
+    """Reservas de estoque com validade, feitas enquanto o PIX não é pago
+
+    Uma reserva não altera o estoque gravado: ela só segura uma unidade, e o
+    disponível é `estoque - reservadas`. Na aprovação a reserva é confirmada e
+    o estoque baixa; no cancelamento ou na expiração ela é apenas descartada.
+    Os métodos não têm await, então cada operação é atômica no event loop.
+    """
+
+    def __init__(self):
+        # reserva_id -> (produto_id, usuario, expira_em)
+        self.reservas = {}
+        self.por_produto = Counter()
+        # Heap (expira_em, reserva_id); entradas de reservas já resolvidas são ignoradas
+        self.expiracoes = []
+
+    def carregar(self, reservas):
+        for reserva_id, (produto_id, usuario, expira_em) in reservas.items():
+            self._guardar(reserva_id, produto_id, usuario, expira_em)
+
+    def _guardar(self, reserva_id, produto_id, usuario, expira_em):
+        self.reservas[reserva_id] = (produto_id, usuario, expira_em)
+        self.por_produto[produto_id] += 1
+        heapq.heappush(self.expiracoes, (expira_em, reserva_id))
+
+    def disponivel(self, produto):
+        return produto["estoque"] - self.por_produto[produto["id"]]
+
+    def reservar(self, produto, usuario, expira_em):
+        """Segura uma unidade do produto; retorna o ID da reserva ou None sem estoque"""
+        if self.disponivel(produto) <= 0:
+            return None
+        reserva_id = uuid.uuid4().hex
+        self._guardar(reserva_id, produto["id"], usuario, expira_em)
+        return reserva_id
+
+    def liberar(self, reserva_id):
+        """Descarta a reserva e retorna o produto dela (ou None se já tinha sido resolvida)"""
+        reserva = self.reservas.pop(reserva_id, None)
+        if reserva is None:
+            return None
+        produto_id = reserva[0]
+        self.por_produto[produto_id] -= 1
+        if self.por_produto[produto_id] <= 0:
+            del self.por_produto[produto_id]
+        return produto_id
+
+    def expirar(self, agora):
+        """Descarta as reservas vencidas em O(vencidas) e retorna seus IDs"""
+        expiradas = []
+        while self.expiracoes and self.expiracoes[0][0] <= agora:
+            _, reserva_id = heapq.heappop(self.expiracoes)
+            if self.liberar(reserva_id) is not None:
+                expiradas.append(reserva_id)
+        return expiradas
@@ -0,0 +1,32 @@
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+
+
+class GerenciadorTravas:
+    """Travas assíncronas por conta, sem uma trava global"""
+
+    def __init__(self):
+        # Travas sem ninguém usando ou esperando são liberadas sozinhas
+        self._travas = weakref.WeakValueDictionary()
+
+    def _trava(self, chave):
+        trava = self._travas.get(chave)
+        if trava is None:
+            trava = asyncio.Lock()
+            self._travas[chave] = trava
+        return trava
+
+    @asynccontextmanager
+    async def adquirir(self, *chaves):
+        """Adquire as travas das chaves sempre em ordem crescente, evitando deadlock"""
+        travas = [self._trava(chave) for chave in sorted(set(chaves))]
+        adquiridas = []
+        try:
+            for trava in travas:
+                await trava.acquire()
+                adquiridas.append(trava)
+            yield
+        finally:
+            for trava in reversed(adquiridas):
+                trava.release()
@@ -0,0 +1,83 @@
+import json
+import os
+import threading
+from collections import Counter
+from datetime import timedelta
+
+
+class AgregadosVendas:
+    """Totais de vendas por dia, atualizados a cada transação registrada
+
+    Cada dia guarda {"vendas", "receita_centavos", "produtos": {nome: vendas}};
+    um resumo de N dias soma no máximo N dessas linhas, sem reler as
+    transações.
+    """
+
+    def __init__(self, arquivo='data/vendas_agregadas.json'):
+        self.arquivo = arquivo
+        self.trava = threading.Lock()
+        self.dias = {}
+
+    def carregar(self, reconstruir):
+        """Carrega os agregados; se o arquivo não existir, monta a partir de `reconstruir()`
+
+        `reconstruir` deve gerar (data 'YYYY-MM-DD', transações) para cada dia já gravado.
+        """
+        if os.path.exists(self.arquivo):
+            with open(self.arquivo, 'r', encoding='utf-8') as f:
+                self.dias = json.load(f)
+            return
+
+        for data, transacoes in reconstruir():
+            self._somar(data, transacoes)
+        if self.dias:
+            self._gravar(self.dias)
+            print(f"Agregados de vendas reconstruídos para {len(self.dias)} dias")
+
+    def _somar(self, data, transacoes):
+        dia = self.dias.setdefault(data, {"vendas": 0, "receita_centavos": 0, "produtos": {}})
+        for transacao in transacoes:
+            dia["vendas"] += 1
+            dia["receita_centavos"] += transacao['valor_centavos']
+            nome = transacao['produto_nome']
+            dia["produtos"][nome] = dia["produtos"].get(nome, 0) + 1
+
+    def registrar(self, data, transacoes):
+        """Soma as transações ao dia `data` e grava o arquivo de agregados"""
+        with self.trava:
+            self._somar(data, transacoes)
+            copia = json.loads(json.dumps(self.dias))
+        self._gravar(copia)
+
+    def _gravar(self, dias):
+        temporario = self.arquivo + ".tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dias, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporario, self.arquivo)
+
+    def resumo(self, data_fim, dias):
+        """Combina os `dias` dias até `data_fim` em vendas, receita e contagem por produto"""
+        vendas = 0
+        receita = 0
+        produtos = Counter()
+        with self.trava:
+            for i in range(dias):
+                dia = self.dias.get((data_fim - timedelta(days=i)).strftime("%Y-%m-%d"))
+                if dia:
+                    vendas += dia["vendas"]
+                    receita += dia["receita_centavos"]
+                    produtos.update(dia["produtos"])
+        return vendas, receita, produtos
+
+
+def resumo_pandas(transacoes):
+    """Mesmo resumo de AgregadosVendas, calculado com pandas sobre as transações brutas
+
+    O pandas só é importado aqui, então não pesa na inicialização do bot.
+    Levanta ImportError se ele não estiver instalado.
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(list(transacoes), columns=['produto_nome', 'valor_centavos'])
+    produtos = Counter(df.groupby('produto_nome').size().to_dict())
+    return len(df), int(df['valor_centavos'].sum()), produtos
@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import hmac
+from collections import OrderedDict
+
+from aiohttp import web
+
+
+def verificar_assinatura(segredo, assinatura, request_id, data_id):
+    """Confere o cabeçalho x-signature ("ts=...,v1=...") no formato do Mercado Pago"""
+    partes = dict(parte.strip().split("=", 1) for parte in assinatura.split(",") if "=" in parte)
+    if "ts" not in partes or "v1" not in partes:
+        return False
+    manifesto = f"id:{data_id};request-id:{request_id};ts:{partes['ts']};"
+    esperado = hmac.new(segredo.encode(), manifesto.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(esperado, partes["v1"])
+
+
+class ReceptorWebhook:
+    """Servidor HTTP embutido no bot que recebe notificações de pagamento
+
+    Notificações com assinatura inválida são recusadas e entregas repetidas
+    (mesmo x-request-id) são ignoradas. A resposta espera o tratamento por até
+    `tempo_limite` segundos: se `ao_notificar` falhar, demorar demais ou
+    retornar False, a entrega é esquecida e o provedor recebe 503, então a
+    repetição que ele envia é aceita.
+    """
+
+    def __init__(self, segredo, ao_notificar, porta, host="0.0.0.0", caminho="/webhooks/mercadopago", memoria=10000, tempo_limite=15):
+        self.segredo = segredo
+        self.ao_notificar = ao_notificar
+        self.porta = porta
+        self.host = host
+        self.caminho = caminho
+        self.memoria = memoria
+        self.tempo_limite = tempo_limite
+        # x-request-id das entregas tratadas ou em tratamento, das mais antigas para as mais novas
+        self.vistos = OrderedDict()
+        self.tarefas = set()
+        self.runner = None
+
+    async def iniciar(self):
+        app = web.Application()
+        app.router.add_post(self.caminho, self.receber)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.porta).start()
+        print(f"Webhook de pagamentos ouvindo em {self.host}:{self.porta}{self.caminho}")
+
+    async def receber(self, request):
+        try:
+            corpo = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        if not isinstance(corpo, dict) or not isinstance(corpo.get("data") or {}, dict):
+            return web.Response(status=400)
+
+        data_id = request.query.get("data.id") or str((corpo.get("data") or {}).get("id", ""))
+        request_id = request.headers.get("x-request-id", "")
+        if not data_id or not verificar_assinatura(self.segredo, request.headers.get("x-signature", ""), request_id, data_id):
+            return web.Response(status=401)
+
+        if corpo.get("type", "payment") != "payment":
+            return web.Response(status=200)
+
+        chave = request_id or f"{data_id}:{corpo.get('action')}"
+        if chave in self.vistos:
+            return web.Response(status=200)
+        self.vistos[chave] = None
+        if len(self.vistos) > self.memoria:
+            self.vistos.popitem(last=False)
+
+        # O tratamento não é cancelado no tempo limite: uma aprovação pela metade
+        # deixaria o pagamento inconsistente, então ele termina em segundo plano
+        tarefa = asyncio.create_task(self.ao_notificar(data_id))
+        self.tarefas.add(tarefa)
+        tarefa.add_done_callback(self.tarefas.discard)
+        try:
+            tratado = await asyncio.wait_for(asyncio.shield(tarefa), self.tempo_limite)
+        except asyncio.TimeoutError:
+            print(f"Tempo esgotado ao tratar notificação do pagamento {data_id}")
+            tratado = False
+        except Exception as e:
+            print(f"Erro ao tratar notificação do pagamento {data_id}: {str(e)}")
+            tratado = False
+
+        if tratado is False:
+            # Sem 2xx o provedor repete a entrega, e a repetição não pode ser tomada por duplicata
+            self.vistos.pop(chave, None)
+            return web.Response(status=503)
+        return web.Response(status=200)
+
+    async def fechar(self):
+        if self.runner is not None:
+            await self.runner.cleanup()